@@ -5,6 +5,7 @@ import asyncio  # noqa 841
 import shutil  # noqa 841
 from collections import deque  # noqa 841
 import threading  # noqa 841
+from concurrent.futures import ThreadPoolExecutor, as_completed  # noqa 841
 import queue  # noqa 841
 import os  # noqa 841
 import webbrowser  # noqa 841
@@ -15,6 +16,7 @@ import warnings  # noqa 841
 import yaml  # noqa 841
 import re  # noqa 841
 import random  # noqa 841
+import numpy as np  # noqa 841
 from bs4 import BeautifulSoup  # noqa 841
 import requests  # noqa 841
 import time  # noqa 841
@@ -29,6 +31,13 @@ from pathlib import PurePosixPath  # noqa 841
 from dashscope import ImageSynthesis  # noqa 841
 import mimetypes  # noqa 841
 import json  # noqa 841
+import sqlite3  # noqa 841
+import hashlib  # noqa 841
+import base64  # noqa 841
+import atexit  # noqa 841
+import multiprocessing
+import codecs  # noqa 841
+import math  # noqa 841
 import logging  # noqa 841
 
 from crewai.tools import BaseTool  # noqa 841
@@ -92,6 +101,8 @@ def admin_run():
 
 
 if __name__ == "__main__":
+    # 搜索模块在 spawn 方式的子进程中执行，打包后的程序需要调用
+    multiprocessing.freeze_support()
 
     if len(sys.argv) > 1:  # 第一个是文件名，如果多于1个，说明其他模式启动
         if sys.argv[1] == "-d":
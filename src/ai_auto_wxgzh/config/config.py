@@ -29,6 +29,8 @@ class Config:
         self.config = None
         self.aipy_config = None
         self._aipy_settings = None  # 实际使用
+        self._aipy_generation = 0  # aipy 配置每重新加载一次加 1
+        self._aipy_mtime = None  # 加载时 aipyapp.toml 的修改时间
         self.error_message = None
         self._config_path = self.__get_config_path()
         self._config_aipy_path = self.__get_config_path("aipyapp.toml")
@@ -138,6 +140,29 @@ class Config:
             "use_compress": False,
             "use_search_service": False,
             "aipy_search_max_results": 10,
+            "aipy_search_timeout": 120,  # 单次搜索（含摘要补全）的时间预算（秒）
+            "search_sandbox": True,  # 生成的搜索代码是否在子进程中执行（超时可强制终止）
+            "hotnews": {
+                "cache_ttl": 600,  # 热榜快照有效期（秒）
+                "stale_ttl": 3600,  # 过期后仍可直接使用的时间（后台刷新）
+                "retry_interval": 60,  # 拉取失败后，间隔多久才再次请求
+                "persist_cache": True,  # 是否将快照保存到本地
+                "timeout": 10,  # 数据源请求超时（秒）
+                "quorum": 1,  # 收到几个数据源的有效结果即返回
+                "history_days": 7,  # 同一公众号多少天内不重复选择相同/近似话题
+                "history_max_distance": 6,  # 近似话题判定阈值（SimHash汉明距离）
+                "store_enabled": True,  # 是否保存热榜历史，用于优先选择排名上升快的话题
+                "store_retention_days": 30,  # 热榜历史保留天数
+                "store_downsample_after_hours": 24,  # 超过该时间的历史每小时只保留一条
+                "velocity_window_hours": 3,  # 计算排名上升速度的时间窗口
+                "providers": [  # 热榜数据源，可添加镜像，parser 为数据格式
+                    {
+                        "name": "vvhan",
+                        "url": "https://api.vvhan.com/api/hotlist/all",
+                        "parser": "vvhan",
+                    },
+                ],
+            },
         }
         self.default_aipy_config = {
             "workdir": "aipy_work",
@@ -344,6 +369,32 @@ class Config:
                 raise ValueError("配置未加载")
             return self.config["aipy_search_max_results"]
 
+    @property
+    def aipy_search_timeout(self):
+        with self._lock:
+            if self.config is None:
+                raise ValueError("配置未加载")
+            # 旧配置文件可能没有该项
+            return self.config.get(
+                "aipy_search_timeout", self.default_config["aipy_search_timeout"]
+            )
+
+    @property
+    def search_sandbox(self):
+        with self._lock:
+            if self.config is None:
+                raise ValueError("配置未加载")
+            # 旧配置文件可能没有该项
+            return self.config.get("search_sandbox", self.default_config["search_sandbox"])
+
+    @property
+    def hotnews(self):
+        with self._lock:
+            if self.config is None:
+                raise ValueError("配置未加载")
+            # 旧配置文件可能没有该项，使用默认值补全
+            return {**self.default_config["hotnews"], **(self.config.get("hotnews") or {})}
+
     @property
     def api_list(self):
         with self._lock:
@@ -477,7 +528,14 @@ class Config:
                 raise ValueError("配置未加载")
             return self.aipy_config
 
+    def __aipy_file_mtime(self):
+        try:
+            return os.path.getmtime(self._config_aipy_path)
+        except OSError:
+            return None
+
     def __update_aipy_config(self):
+        self._aipy_mtime = self.__aipy_file_mtime()
         file_abs_path = os.path.abspath(self._config_aipy_path)
         dir_path = os.path.dirname(file_abs_path)
         conf = ConfigManager(get_default_config(), dir_path)
@@ -491,6 +549,7 @@ class Config:
             settings.auto_install = False
 
         self._aipy_settings = settings
+        self._aipy_generation += 1
 
     def get_aipy_settings(self):
         # 如果有变化，需要重新加载，在更新保存的地方加载
@@ -500,6 +559,14 @@ class Config:
 
             return self._aipy_settings
 
+    def get_aipy_generation(self):
+        """返回 aipy 配置的代数，aipyapp.toml 在外部被修改时先重新加载"""
+        with self._lock:
+            if self._aipy_settings is None or self._aipy_mtime != self.__aipy_file_mtime():
+                self.__update_aipy_config()
+
+            return self._aipy_generation
+
     def save_config(self, config, aipy_config=None):
         """保存配置到 config.yaml，不验证"""
         with self._lock:
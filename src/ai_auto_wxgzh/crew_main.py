@@ -6,7 +6,6 @@ import asyncio
 
 from src.ai_auto_wxgzh.tools import hotnews
 from src.ai_auto_wxgzh.crew import AutowxGzh
-from src.ai_auto_wxgzh.utils import utils
 from src.ai_auto_wxgzh.utils import log
 from src.ai_auto_wxgzh.config.config import Config
 
@@ -67,17 +66,21 @@ def autowx_gzh(stop_event=None, ui_mode=False):
     os.environ["MODEL"] = config.api_model
     os.environ["OPENAI_API_BASE"] = config.api_apibase
 
-    for credential in config.wechat_credentials:
+    # 如果没用配置appid，则忽略该条
+    credentials = [
+        credential
+        for credential in config.wechat_credentials
+        if len(credential["appid"]) > 0 and len(credential["appsecret"]) > 0
+    ]
+
+    # 基于同一份热榜，为所有公众号一次性分配互不相同的话题
+    assignments = hotnews.assign_topics(credentials, config.platforms, 5)
+
+    for credential, (platform, topic) in zip(credentials, assignments):
         appid = credential["appid"]
         appsecret = credential["appsecret"]
         author = credential["author"]
 
-        # 如果没用配置appid，则忽略该条
-        if len(appid) == 0 or len(appsecret) == 0:
-            continue
-
-        platform = utils.get_random_platform(config.platforms)
-        topic = hotnews.select_platform_topic(platform, 5)  # 前五个热门话题根据一定权重选一个
         inputs = {"platform": platform, "topic": topic}
 
         log.print_log("CrewAI开始工作...")
@@ -90,6 +93,7 @@ def autowx_gzh(stop_event=None, ui_mode=False):
                     loop.run_until_complete(
                         run_crew_async(stop_event, inputs, appid, appsecret, author)
                     )
+                    hotnews.record_published_topic(appid, topic, platform)
                     log.print_log("任务完成！")
                 finally:
                     loop.close()
@@ -100,6 +104,7 @@ def autowx_gzh(stop_event=None, ui_mode=False):
         else:
             try:
                 run(inputs, appid, appsecret, author)
+                hotnews.record_published_topic(appid, topic, platform)
                 log.print_log("任务完成！")
             except Exception as e:
                 log.print_log(f"执行出错：{str(e)}")
@@ -668,6 +668,8 @@ class ConfigEditor:
             # 保存微信配置
             elif event.startswith("-SAVE_WECHAT-"):
                 config = self.config.get_config().copy()
+                # 界面第 i 个凭证对应原配置的第 i 个（新添加的凭证序号在原配置之后）
+                existing = self.config.wechat_credentials
                 credentials = []
                 # 遍历窗口中所有可能的微信凭证键
                 max_index = -1
@@ -692,13 +694,16 @@ class ConfigEditor:
                         and author_key in self.window.AllKeysDict
                         and self.window[appid_key].visible
                     ):
-                        credentials.append(
+                        # 保留界面上没有的字段（如公众号的平台偏好 platforms）
+                        credential = dict(existing[i]) if i < len(existing) else {}
+                        credential.update(
                             {
                                 "appid": values.get(appid_key, ""),
                                 "appsecret": values.get(secret_key, ""),
                                 "author": values.get(author_key, ""),
                             }
                         )
+                        credentials.append(credential)
                     i += 1
                 config["wechat"]["credentials"] = credentials
                 if self.config.save_config(config):
@@ -23,6 +23,8 @@ from src.ai_auto_wxgzh.utils import comm
 from src.ai_auto_wxgzh.utils import utils
 from src.ai_auto_wxgzh.utils import log
 from src.ai_auto_wxgzh.config.config import Config
+from src.ai_auto_wxgzh.tools import search_sandbox
+from src.ai_auto_wxgzh.tools import aipy_workers
 
 from src.ai_auto_wxgzh.gui import ConfigEditor
 
@@ -282,6 +284,8 @@ class MainGUI(object):
             if event == sg.WIN_CLOSED:  # always,  always give a way out!
                 if self._is_running and self._crew_thread and self._crew_thread.is_alive():
                     self._stop_event.set()
+                    search_sandbox.kill_running_searches()  # 正在执行的搜索直接终止
+                    aipy_workers.cancel_running_tasks()
                     self._crew_thread.join(timeout=2.0)
                     if self._crew_thread.is_alive():
                         log.print_log("警告：任务终止超时，可能未完全停止")
@@ -336,6 +340,8 @@ class MainGUI(object):
             elif event == "-STOP_BTN-":
                 if self._is_running and self._crew_thread and self._crew_thread.is_alive():
                     self._stop_event.set()
+                    search_sandbox.kill_running_searches()  # 正在执行的搜索直接终止
+                    aipy_workers.cancel_running_tasks()
                     self._crew_thread.join(timeout=2.0)
                     if self._crew_thread.is_alive():
                         log.print_log("警告：任务终止超时，可能未完全停止")
@@ -0,0 +1,356 @@
+import json
+import time
+import queue
+import atexit
+import threading
+import multiprocessing
+from pathlib import Path
+
+from src.ai_auto_wxgzh.utils import log
+from src.ai_auto_wxgzh.config.config import Config
+
+
+def _json_safe(value):
+    """转换为可以跨进程传递的 JSON 数据（无法序列化的对象转为字符串）"""
+    return json.loads(json.dumps(value, ensure_ascii=False, default=str))
+
+
+def _handle_task(task_manager, instruction):
+    """执行 AIPy 任务，返回代码执行历史和对话消息"""
+    task = task_manager.new_task(instruction)
+    task.run()
+    snapshot = {
+        "runner": _json_safe(task.runner.history),
+        "messages": _json_safe(task.llm.history.get_messages()),
+    }
+    task.done()  # 保存任务记录（在子进程工作目录中）并清空对话和执行历史
+    return snapshot
+
+
+def _handle_llm(task_manager, instruction):
+    """直接调用 LLM，返回回复文本"""
+    try:
+        return task_manager.llm(instruction)
+    finally:
+        task_manager.llm.clear()  # 每次请求都是独立的对话
+
+
+def _handle_ping(task_manager):
+    """健康检查：当前 LLM 客户端可用（已配置模型和密钥）且代码执行环境能运行空代码时返回 True"""
+    if not task_manager.llm.current.usable():
+        return False
+    result = task_manager.runner("__result__ = {'pong': True}", {})
+    return bool((result.get("__result__") or {}).get("pong"))
+
+
+# 请求类型 -> 处理函数(task_manager, *args)
+_HANDLERS = {"task": _handle_task, "llm": _handle_llm, "ping": _handle_ping}
+
+
+def _reset(task_manager):
+    """清空上一个任务留下的对话、执行历史和变量，TaskManager 可以直接用于下一个任务"""
+    task_manager.task = None
+    task_manager.llm.clear()
+    task_manager.runner.clear()
+
+
+def _worker_main(conn, work_dir):
+    """
+    子进程入口：在独立的工作目录中创建 TaskManager，完成后发送 ("ready", None)，
+    然后循环处理 (请求类型, 参数) 并返回结果，每个请求结束后重置 TaskManager
+    """
+    try:
+        from aipyapp.aipy import TaskManager
+        from rich.console import Console
+
+        Path(work_dir).mkdir(parents=True, exist_ok=True)
+        settings = Config.get_instance().get_aipy_settings()
+        settings.set("workdir", str(work_dir))  # 绝对路径，TaskManager 直接切换到该目录
+        task_manager = TaskManager(settings, console=Console())
+    except Exception as e:
+        conn.send(("error", f"TaskManager初始化失败: {type(e).__name__}: {e}"))
+        return
+    conn.send(("ready", None))
+
+    while True:
+        try:
+            kind, args = conn.recv()
+        except (EOFError, OSError):
+            break
+        try:
+            conn.send(("ok", _HANDLERS[kind](task_manager, *args)))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+        finally:
+            _reset(task_manager)
+
+
+class _Worker:
+    def __init__(self, ctx, index, work_dir):
+        self.index = index
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, work_dir), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.ready = False  # 收到子进程的 ready 消息后为 True
+        self.tasks = 0
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=1)
+        self.conn.close()
+
+
+class AipyWorkerPool:
+    """
+    在子进程中执行 AIPy 任务：
+    - 每个子进程有自己的 TaskManager 和工作目录（work_root/worker_N），切换目录不影响主进程
+    - 子进程在创建进程池时启动并初始化 TaskManager（LLM 客户端等），之后的任务直接复用，
+      每个任务结束后重置对话和执行历史；执行 max_tasks 次后替换
+    - 同时执行的任务数不超过 size，其余请求等待空闲进程
+    - 请求为 (请求类型, 参数)，子进程返回 ("ok", 结果) 或 ("error", 错误信息)
+    - 超时、取消或子进程崩溃时直接杀掉并补充新进程；取出空闲进程时跳过已退出的进程，
+      并每隔 health_check_interval 秒用 health_check 检查（ping）并替换空闲的异常进程
+    - get_stats 返回等待时间、复用次数等统计
+    """
+
+    def __init__(self, work_root, size=2, max_tasks=50, health_check_interval=300):
+        self.work_root = Path(work_root)
+        self.size = size
+        self.max_tasks = max_tasks
+        self.health_check_interval = health_check_interval
+        self._ctx = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._idle = queue.Queue()
+        self._busy = set()
+        self._closed = False
+        self._timer = None
+        self._stats = {
+            "spawned": 0,
+            "requests": 0,
+            "reused": 0,  # 由已执行过任务的 TaskManager 处理的请求数
+            "failed": 0,
+            "replaced": 0,
+            "wait_time": 0.0,
+            "max_wait_time": 0.0,
+        }
+        for index in range(size):
+            self._idle.put(self._spawn(index))
+        self._schedule_health_check()
+
+    def _spawn(self, index):
+        with self._lock:
+            self._stats["spawned"] += 1
+        return _Worker(self._ctx, index, self.work_root / f"worker_{index}")
+
+    def _acquire(self, timeout):
+        if self._closed:
+            raise RuntimeError("AIPy进程池已停止")
+        start = time.monotonic()
+        while True:
+            try:
+                worker = self._idle.get(timeout=max(start + timeout - time.monotonic(), 0))
+            except queue.Empty:
+                raise TimeoutError("没有空闲的AIPy进程")
+            if worker.process.is_alive():
+                break
+            self._release(worker, healthy=False)  # 空闲期间退出的进程，替换后继续等待
+        waited = time.monotonic() - start
+        with self._lock:
+            self._busy.add(worker)
+            self._stats["requests"] += 1
+            self._stats["reused"] += worker.tasks > 0
+            self._stats["wait_time"] += waited
+            self._stats["max_wait_time"] = max(self._stats["max_wait_time"], waited)
+        return worker
+
+    def _wait_ready(self, worker, deadline):
+        """等待子进程初始化完成，初始化失败抛出 RuntimeError，超时抛出 TimeoutError"""
+        if worker.ready:
+            return
+        if not worker.conn.poll(max(deadline - time.monotonic(), 0)):
+            raise TimeoutError("AIPy进程初始化超时")
+        status, payload = worker.conn.recv()
+        if status != "ready":
+            raise RuntimeError(payload)
+        worker.ready = True
+
+    def _release(self, worker, healthy=True):
+        with self._lock:
+            self._busy.discard(worker)
+            if self._closed:
+                worker.kill()
+                return
+        if not healthy or worker.tasks >= self.max_tasks or not worker.process.is_alive():
+            with self._lock:
+                self._stats["failed"] += not healthy
+                self._stats["replaced"] += 1
+            worker.kill()
+            worker = self._spawn(worker.index)
+        with self._lock:
+            if not self._closed:
+                self._idle.put(worker)
+                return
+        worker.kill()  # 替换期间进程池已停止
+
+    def call(self, kind, *args, timeout=600, cancel_event=None):
+        """
+        在空闲子进程中执行请求并返回结果：
+        超时抛出 TimeoutError，cancel_event 被设置时终止并抛出 InterruptedError，执行出错抛出 RuntimeError
+        """
+        deadline = time.monotonic() + timeout
+        worker = self._acquire(timeout)
+        cancelled = False
+        status = None
+        try:
+            self._wait_ready(worker, deadline)
+            worker.conn.send((kind, args))
+            while status is None:
+                remaining = deadline - time.monotonic()
+                cancelled = cancel_event is not None and cancel_event.is_set()
+                if remaining <= 0 or cancelled:
+                    break
+                if worker.conn.poll(min(remaining, 0.2)):
+                    status, payload = worker.conn.recv()
+        except (EOFError, OSError, RuntimeError) as e:
+            if isinstance(e, TimeoutError):
+                raise
+            raise RuntimeError(f"AIPy进程异常: {e}")
+        finally:
+            # 没有正常收到结果（超时、取消、子进程崩溃或其他任何异常）时替换子进程
+            if status is not None:
+                worker.tasks += 1
+            self._release(worker, healthy=status is not None)
+
+        if status is None:
+            if cancelled:
+                raise InterruptedError(f"AIPy任务已取消: {kind}")
+            raise TimeoutError(f"AIPy任务执行超时，已终止: {kind}")
+        if status == "error":
+            raise RuntimeError(payload)
+        return payload
+
+    def run_task(self, instruction, **kwargs):
+        """执行 AIPy 任务，返回 {"runner": 代码执行历史, "messages": 对话消息}"""
+        return self.call("task", instruction, **kwargs)
+
+    def ask_llm(self, instruction, **kwargs):
+        """直接调用 LLM，返回回复文本（LLM 不可用时为 None）"""
+        return self.call("llm", instruction, **kwargs)
+
+    def health_check(self, timeout=10):
+        """检查空闲的子进程（ping），替换已退出或无响应的进程，返回检查通过的进程数"""
+        healthy = 0
+        for _ in range(self._idle.qsize()):
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._busy.add(worker)
+            ok = False
+            try:
+                deadline = time.monotonic() + timeout
+                self._wait_ready(worker, deadline)
+                worker.conn.send(("ping", ()))
+                if worker.conn.poll(max(deadline - time.monotonic(), 0)):
+                    status, payload = worker.conn.recv()
+                    ok = status == "ok" and payload
+            except (EOFError, OSError, RuntimeError):
+                pass
+            finally:
+                healthy += bool(ok)
+                self._release(worker, healthy=bool(ok))
+        return healthy
+
+    def _schedule_health_check(self):
+        with self._lock:
+            if self._closed or not self.health_check_interval:
+                return
+            self._timer = threading.Timer(self.health_check_interval, self._periodic_health_check)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _periodic_health_check(self):
+        try:
+            checked = self._idle.qsize()
+            healthy = self.health_check()
+            if healthy < checked:
+                log.print_log(f"AIPy进程健康检查: 已替换 {checked - healthy} 个异常进程")
+        finally:
+            self._schedule_health_check()
+
+    def get_stats(self):
+        """返回进程池统计：请求数、复用次数、等待时间、启动/替换的进程数等"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["busy"] = len(self._busy)
+        stats["size"] = self.size
+        stats["idle"] = self._idle.qsize()
+        stats["avg_wait_time"] = stats["wait_time"] / max(stats["requests"], 1)
+        return stats
+
+    def cancel_all(self):
+        """终止所有正在执行的任务，对应的 call 抛出 RuntimeError"""
+        with self._lock:
+            busy = list(self._busy)
+        for worker in busy:
+            if worker.process.is_alive():
+                worker.process.kill()
+
+    def retire(self):
+        """停止使用进程池：终止空闲进程，正在执行的任务完成后再终止对应进程"""
+        with self._lock:
+            self._closed = True
+            if self._timer is not None:
+                self._timer.cancel()
+        while True:
+            try:
+                self._idle.get_nowait().kill()
+            except queue.Empty:
+                break
+
+    def shutdown(self):
+        self.retire()
+        with self._lock:
+            busy = list(self._busy)
+        for worker in busy:
+            worker.kill()
+
+
+_pool = None
+_pool_generation = None
+_pool_lock = threading.Lock()
+
+
+def get_aipy_pool():
+    """
+    获取进程内共享的 AIPy 进程池（首次调用时启动子进程并预先初始化 TaskManager），
+    子进程工作目录位于 aipy 工作目录的 workers 子目录下
+    aipy 配置重新加载后创建新的进程池，旧进程池的任务完成后终止对应进程
+    """
+    global _pool, _pool_generation
+    config = Config.get_instance()
+    generation = config.get_aipy_generation()
+    with _pool_lock:
+        if _pool is None or _pool_generation != generation:
+            if _pool is not None:
+                _pool.retire()
+                log.print_log("aipy配置已更新，重新启动AIPy进程池")
+            work_dir = Path(config.get_aipy_settings().get("workdir", "aipy_work"))
+            if not work_dir.is_absolute():
+                work_dir = Path.cwd() / work_dir
+            _pool = AipyWorkerPool(work_dir / "workers")
+            _pool_generation = generation
+            atexit.register(_pool.shutdown)
+            log.print_log(f"AIPy进程池已启动，工作目录: {work_dir / 'workers'}")
+        return _pool
+
+
+def cancel_running_tasks():
+    """终止正在执行的 AIPy 任务，进程池未启动时什么也不做"""
+    with _pool_lock:
+        pool = _pool
+    if pool is not None:
+        pool.cancel_all()
@@ -7,13 +7,11 @@ from typing import Type
 from crewai.tools import BaseTool
 from pydantic import BaseModel, Field
 
-from rich.console import Console
-from aipyapp.aipy.taskmgr import TaskManager
-
 from src.ai_auto_wxgzh.tools.wx_publisher import WeixinPublisher
 from src.ai_auto_wxgzh.utils import utils
 from src.ai_auto_wxgzh.config.config import Config
-from src.ai_auto_wxgzh.tools.search_service import SearchService
+from src.ai_auto_wxgzh.tools.search_service import get_search_service
+from src.ai_auto_wxgzh.tools.aipy_workers import get_aipy_pool
 from src.ai_auto_wxgzh.utils import log
 
 
@@ -215,25 +213,22 @@ class AIPySearchTool(BaseTool):
         """执行AIPy搜索"""
         config = Config.get_instance()
 
-        # 保存当前工作目录
-        original_cwd = os.getcwd()
+        # AIPy 任务在子进程中执行，不会改变当前进程的工作目录，多个搜索可以同时进行
         if config.use_search_service:
-            results = self._use_search_service(topic, config.aipy_search_max_results)
-        else:
-            results = self._nouse_search_service(topic, config.aipy_search_max_results)
-
-        # 恢复原始工作目录
-        os.chdir(original_cwd)
-
-        return results
+            return self._use_search_service(
+                topic, config.aipy_search_max_results, config.aipy_search_timeout
+            )
+        return self._nouse_search_service(topic, config.aipy_search_max_results)
 
-    def _use_search_service(self, topic, max_results):
+    def _use_search_service(self, topic, max_results, timeout=None):
         try:
-            # 初始化搜索服务
-            search_service = SearchService()
+            # 获取共享的搜索服务（首次调用时初始化）
+            search_service = get_search_service()
 
-            # 执行搜索
-            results = search_service.search(topic, max_results, use_fix_results_parallel=True)
+            # 执行搜索，超过时间预算返回部分结果，避免卡住后续的写作任务
+            results = search_service.search(
+                topic, max_results, use_fix_results_parallel=True, deadline=timeout
+            )
 
             if results:
                 return str(results)
@@ -244,17 +239,6 @@ class AIPySearchTool(BaseTool):
 
     def _nouse_search_service(self, topic, max_results):
         try:
-            # 初始化AIPy
-            console = Console()
-            # 创建TaskManager
-            try:
-                task_manager = TaskManager(
-                    Config.get_instance().get_aipy_settings(), console=console
-                )
-            except Exception as e:
-                console.print_exception()
-                raise e
-
             # 创建搜索任务
             # 考虑到墙的因素，不要优先使用谷歌搜索
             # 微信需要无代理，所以为了整个执行成功，建议关闭
@@ -305,21 +289,16 @@ class AIPySearchTool(BaseTool):
             只返回完整的Python代码，不要有任何解释。
             """
 
-            task = task_manager.new_task(search_instruction)
-
-            # 执行任务
-            task.run()
+            # 在AIPy子进程中执行任务（任务记录保存在子进程的工作目录中）
+            snapshot = get_aipy_pool().run_task(search_instruction)
 
             # 从任务历史中提取搜索结果
             search_results = None
-            for entry in task.runner.history:
+            for entry in snapshot["runner"]:
                 if "__result__" in entry.get("result", {}):
                     search_results = entry["result"]["__result__"]
                     break
 
-            # 完成任务并保存结果
-            task.done()
-
             if search_results:
                 return str(search_results)
             else:
@@ -1,33 +1,243 @@
-import requests
-import random
+import os
+import json
+import time
+import threading
 from typing import Optional, List, Dict
 
 from src.ai_auto_wxgzh.utils import log
+from src.ai_auto_wxgzh.utils import utils
+from src.ai_auto_wxgzh.config.config import Config
+from src.ai_auto_wxgzh.tools.hotnews_sources import HotnewsAggregator, HotnewsProvider
+from src.ai_auto_wxgzh.tools.topic_scorer import TopicScorer, TopicScores
+from src.ai_auto_wxgzh.tools.topic_history import TopicHistory
+from src.ai_auto_wxgzh.tools.hotnews_store import HotnewsStore
 
 
-def get_hotnews() -> Optional[List[Dict]]:
+def _get_hotnews_settings():
+    config = Config.get_instance()
+    try:
+        return config.hotnews
+    except ValueError:  # 未加载配置（如单独运行本模块）时使用默认值
+        return config.default_config["hotnews"]
+
+
+_hotnews_aggregator = None
+_hotnews_aggregator_lock = threading.Lock()
+
+
+def get_hotnews_aggregator() -> HotnewsAggregator:
+    """获取进程内共享的热榜数据源聚合器"""
+    global _hotnews_aggregator
+    with _hotnews_aggregator_lock:
+        if _hotnews_aggregator is None:
+            settings = _get_hotnews_settings()
+            providers = [
+                HotnewsProvider.from_config(p, timeout=settings["timeout"])
+                for p in settings["providers"]
+            ]
+            _hotnews_aggregator = HotnewsAggregator(
+                providers, quorum=settings["quorum"], timeout=settings["timeout"]
+            )
+        return _hotnews_aggregator
+
+
+def fetch_hotnews() -> Optional[List[Dict]]:
     """
-    获取各大平台热点数据
-    返回格式: {"success": true, "data": 数组数据}
+    并发请求已配置的热榜数据源（不经过缓存）
+    返回格式: [{"name": 平台名, "data": [{"title": ...}, ...]}, ...]
     """
-    api_url = "https://api.vvhan.com/api/hotlist/all"
-
     try:
-        response = requests.get(api_url, timeout=10)
-        response.raise_for_status()
+        return get_hotnews_aggregator().fetch()
+    except ValueError as e:
+        log.print_log(f"热榜数据源配置错误: {str(e)}")
+        return None
 
-        data = response.json()
-        if data.get("success") and isinstance(data.get("data"), list):
-            return data["data"]
 
-        return None
+class HotnewsCache:
+    """
+    进程内共享的热榜快照缓存：
+    - ttl 内直接返回快照，多个公众号共用一次拉取
+    - 过期但在 stale_ttl 内时，先返回旧快照，同时后台刷新
+    - 拉取失败后 retry_interval 内不再请求，避免每个账号都等待超时
+    - 可选持久化到本地文件（写临时文件后原子替换）
+    - 每次拉取到新快照后调用 on_update(data, timestamp)
+    """
+
+    def __init__(
+        self,
+        fetcher,
+        ttl=600,
+        stale_ttl=3600,
+        retry_interval=60,
+        cache_file=None,
+        on_update=None,
+    ):
+        self._fetcher = fetcher
+        self._on_update = on_update
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self.retry_interval = retry_interval
+        self.cache_file = cache_file
+
+        self._lock = threading.Lock()  # 保护快照数据
+        self._fetch_lock = threading.Lock()  # 保证同一时刻只有一个请求
+        self._snapshot = None  # {"timestamp": float, "data": list}
+        self._last_failure = 0
+        self._refreshing = False
 
-    except requests.exceptions.RequestException as e:
-        log.print_log(f"请求异常: {str(e)}")
+        if self.cache_file:
+            self._snapshot = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.cache_file):
+            return None
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            if isinstance(snapshot.get("data"), list):
+                snapshot["timestamp"] = float(snapshot.get("timestamp", 0))
+                return snapshot
+        except Exception as e:
+            log.print_log(f"加载热榜缓存失败: {str(e)}")
         return None
-    except ValueError as e:
-        log.print_log(f"JSON解析异常: {str(e)}")
+
+    def _save(self, snapshot):
+        tmp_file = f"{self.cache_file}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp_file, self.cache_file)
+        except Exception as e:
+            log.print_log(f"保存热榜缓存失败: {str(e)}")
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+
+    def get(self, force_refresh=False) -> Optional[List[Dict]]:
+        with self._lock:
+            snapshot = self._snapshot
+
+        if snapshot is not None and not force_refresh:
+            age = time.time() - snapshot["timestamp"]
+            if age < self.ttl:
+                return snapshot["data"]
+            if age < self.stale_ttl:
+                self._refresh_async()
+                return snapshot["data"]
+
+        return self._refresh(force_refresh)
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+            self._last_failure = 0
+
+    def _refresh(self, force_refresh=False):
+        requested_at = time.time()
+        with self._fetch_lock:
+            with self._lock:
+                snapshot = self._snapshot
+                # 等锁期间其他线程已经刷新过了，直接使用
+                if snapshot is not None and snapshot["timestamp"] >= requested_at:
+                    return snapshot["data"]
+                # 最近刚失败过，不再重复等待超时，有旧数据就用旧数据
+                if not force_refresh and requested_at - self._last_failure < self.retry_interval:
+                    return snapshot["data"] if snapshot else None
+
+            data = self._fetcher()
+
+            with self._lock:
+                if data:
+                    self._snapshot = {"timestamp": time.time(), "data": data}
+                    self._last_failure = 0
+                    snapshot = self._snapshot
+                else:
+                    self._last_failure = time.time()
+                    return self._snapshot["data"] if self._snapshot else None
+
+            if self.cache_file:
+                self._save(snapshot)
+            if self._on_update:
+                try:
+                    self._on_update(data, snapshot["timestamp"])
+                except Exception as e:
+                    log.print_log(f"处理热榜快照出错: {str(e)}")
+            return data
+
+    def _refresh_async(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def worker():
+            try:
+                self._refresh()
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=worker, daemon=True).start()
+
+
+_hotnews_store = None
+_hotnews_store_lock = threading.Lock()
+
+
+def get_hotnews_store() -> Optional[HotnewsStore]:
+    """获取热榜时间序列存储，未开启时返回 None"""
+    global _hotnews_store
+    settings = _get_hotnews_settings()
+    if not settings["store_enabled"]:
         return None
+    with _hotnews_store_lock:
+        if _hotnews_store is None:
+            _hotnews_store = HotnewsStore(
+                os.path.join(utils.get_current_dir("cache"), "hotnews_history.db"),
+                retention_days=settings["store_retention_days"],
+                downsample_after_hours=settings["store_downsample_after_hours"],
+            )
+        return _hotnews_store
+
+
+def _append_to_store(data, timestamp):
+    store = get_hotnews_store()
+    if store:
+        store.append(data, timestamp)
+
+
+_hotnews_cache = None
+_hotnews_cache_lock = threading.Lock()
+
+
+def get_hotnews_cache() -> HotnewsCache:
+    """获取进程内共享的热榜缓存"""
+    global _hotnews_cache
+    with _hotnews_cache_lock:
+        if _hotnews_cache is None:
+            settings = _get_hotnews_settings()
+            cache_file = None
+            if settings["persist_cache"]:
+                cache_file = os.path.join(utils.get_current_dir("cache"), "hotnews.json")
+            _hotnews_cache = HotnewsCache(
+                fetch_hotnews,
+                ttl=settings["cache_ttl"],
+                stale_ttl=settings["stale_ttl"],
+                retry_interval=settings["retry_interval"],
+                cache_file=cache_file,
+                on_update=_append_to_store,
+            )
+        return _hotnews_cache
+
+
+def get_hotnews(use_cache=True) -> Optional[List[Dict]]:
+    """
+    获取各大平台热点数据，默认使用共享快照缓存
+    返回格式: [{"name": 平台名, "data": [{"title": ...}, ...]}, ...]
+    """
+    if not use_cache:
+        return fetch_hotnews()
+
+    return get_hotnews_cache().get()
 
 
 def get_platform_news(platform, cnt=10):
@@ -39,23 +249,122 @@ def get_platform_news(platform, cnt=10):
     return [item["title"] for item in platform_data[:cnt]]
 
 
-def select_platform_topic(platform, cnt=10):
+DEFAULT_TOPIC = "DeepSeek AI 提效秘籍"
+
+
+def get_topic_history(appid) -> TopicHistory:
+    """获取公众号的已发布话题历史"""
+    settings = _get_hotnews_settings()
+    return TopicHistory.get_instance(
+        appid, settings["history_days"], settings["history_max_distance"]
+    )
+
+
+def record_published_topic(appid, topic, platform=None):
+    """记录公众号已发布的话题，窗口期内不再选择相同或近似的话题"""
+    if appid:
+        get_topic_history(appid).add(topic, platform)
+
+
+def select_platform_topic(platform, cnt=10, appid=None):
     """
-    获取指定平台的新闻话题，并按排名加权随机选择一个话题。
+    按与 assign_topics 相同的打分从指定平台的前 cnt 个话题中选择一个话题。
+    传入 appid 时跳过该公众号近期已发布过的（近似）话题。
     若无话题，返回默认话题。
     """
-    topics = get_platform_news(platform, cnt)
-    if not topics:
-        topics = ["DeepSeek AI 提效秘籍"]
-        log.print_log("无法获取到热榜，接口暂时不可用，将使用默认话题。")
+    credential = {"appid": appid} if appid else {}
+    return assign_topics([credential], [{"name": platform, "weight": 1}], cnt)[0][1]
+
+
+_last_scores = None  # (快照, 平台配置, cnt, TopicScores)，同一快照只打分一次
+_last_scores_lock = threading.Lock()
+
+
+def score_topics(platforms, cnt=5) -> TopicScores:
+    """
+    对当前热榜快照中所有平台的前 cnt 个话题统一打分
+    platforms 为配置中的平台及权重，返回的 TopicScores 可通过 top() 查看各项得分
+    """
+    global _last_scores
+    hotnews = get_hotnews()
+    with _last_scores_lock:
+        if (
+            _last_scores is not None
+            and _last_scores[0] is hotnews
+            and _last_scores[1] == platforms
+            and _last_scores[2] == cnt
+        ):
+            return _last_scores[3]
+
+    velocities = None
+    store = get_hotnews_store()
+    if store:
+        velocities = store.velocities(_get_hotnews_settings()["velocity_window_hours"])
+    scores = TopicScorer(platforms).score(hotnews, cnt, velocities=velocities)
+    with _last_scores_lock:
+        _last_scores = (hotnews, platforms, cnt, scores)
+    return scores
+
+
+def _platform_preferences(credential):
+    """
+    公众号的平台偏好，credential 中可选配置 platforms：
+    平台名列表（等权重），或 [{"name": 平台名, "weight": 权重}]
+    """
+    preferences = credential.get("platforms")
+    if not preferences:
+        return None
+    weights = {}
+    for p in preferences:
+        if isinstance(p, dict):
+            weights[p["name"]] = float(p.get("weight", 1))
+        else:
+            weights[p] = 1.0
+    return weights
+
 
-    # 加权随机选择：排名靠前的话题权重更高
-    weights = [
-        1 / (i + 1) ** 2 for i in range(len(topics))
-    ]  # 权重递减，如 [68.30%,17.08%,7.59%,4.27%,2.73%,...]
-    selected_topic = random.choices(topics, weights=weights, k=1)[0]
+def assign_topics(credentials, platforms, cnt=5):
+    """
+    基于同一份热榜快照，一次性为所有公众号分配互不相同的话题（加权无放回采样）
+    - 跳过各公众号近期已发布过的（近似）话题
+    - 支持公众号级别的平台偏好（credential["platforms"]）
+    返回与 credentials 一一对应的 [(平台, 话题), ...]
+    """
+    scores = score_topics(platforms, cnt)
+    assigned = set()  # 已分配话题的标准化标题
+    assignments = []
+
+    for credential in credentials:
+        appid = credential.get("appid")
+        history = get_topic_history(appid) if appid else None
+        preferences = _platform_preferences(credential)
+
+        def is_assigned(title):
+            return utils.normalize_title(title) in assigned
+
+        def is_used(title):
+            return is_assigned(title) or (history is not None and history.contains(title))
 
-    return selected_topic
+        # 依次放宽条件：平台偏好 -> 近期发布记录 -> 与其他公众号不重复
+        selected = None
+        for exclude, weights in (
+            (is_used, preferences),
+            (is_used, None),
+            (is_assigned, None),
+            (None, None),
+        ):
+            selected = scores.sample(exclude=exclude, platform_weights=weights)
+            if selected is not None:
+                break
+
+        if selected is None:
+            log.print_log("无法获取到热榜，接口暂时不可用，将使用默认话题。")
+            selected = utils.get_random_platform(platforms), DEFAULT_TOPIC
+
+        assigned.add(utils.normalize_title(selected[1]))
+        assignments.append(selected)
+
+    return assignments
 
 
 if __name__ == "__main__":
@@ -66,5 +375,9 @@ if __name__ == "__main__":
         for platform in hotnews:
             result[platform["name"]] = [item["title"] for item in platform["data"]]
         log.print_log(result.keys())
+
+        platforms = Config.get_instance().default_config["platforms"]
+        for item in score_topics(platforms).top(10):
+            log.print_log(item)
     else:
         log.print_log("未能获取热点数据")
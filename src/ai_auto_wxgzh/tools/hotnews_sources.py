@@ -0,0 +1,181 @@
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
+from typing import Optional, List, Dict
+
+import requests
+
+from src.ai_auto_wxgzh.utils import log
+from src.ai_auto_wxgzh.utils import http_replay
+
+
+# 解析器注册表：名称 -> 函数(json) -> [{"name": 平台名, "data": [{"title": ...}]}] 或 None
+_parsers = {}
+
+
+def register_parser(name):
+    """注册热榜数据解析器，用于适配不同格式的热榜接口"""
+
+    def decorator(func):
+        _parsers[name] = func
+        return func
+
+    return decorator
+
+
+@register_parser("vvhan")
+def parse_vvhan(data):
+    # {"success": true, "data": [{"name": "微博", "data": [{"title": ...}]}]}
+    if isinstance(data, dict) and data.get("success") and isinstance(data.get("data"), list):
+        return data["data"]
+    return None
+
+
+@register_parser("platform_dict")
+def parse_platform_dict(data):
+    # {"data": {"微博": [{"title": ...}], ...}}，部分镜像使用这种格式
+    platforms = data.get("data") if isinstance(data, dict) else None
+    if not isinstance(platforms, dict):
+        return None
+    return [{"name": name, "data": items} for name, items in platforms.items() if items]
+
+
+class HotnewsProvider:
+    """单个热榜数据源，记录请求延迟和错误统计"""
+
+    def __init__(self, name, url, parser="vvhan", timeout=10):
+        if parser not in _parsers:
+            raise ValueError(f"未知的热榜解析器: {parser}")
+        self.name = name
+        self.url = url
+        self.parser = parser
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=50)
+        self.requests = 0
+        self.failures = 0
+        self.last_error = None
+
+    @classmethod
+    def from_config(cls, conf, timeout=10):
+        """从配置项 {"name": ..., "url": ..., "parser": ...} 创建，缺少 url 时抛出 ValueError"""
+        if not isinstance(conf, dict) or not conf.get("url"):
+            raise ValueError(f"热榜数据源配置缺少 url: {conf}")
+        return cls(
+            conf.get("name") or conf["url"],
+            conf["url"],
+            parser=conf.get("parser", "vvhan"),
+            timeout=timeout,
+        )
+
+    def fetch(self) -> Optional[List[Dict]]:
+        start = time.time()
+        error = None
+        data = None
+        try:
+            response = http_replay.get(self.url, timeout=self.timeout)
+            response.raise_for_status()
+            data = _parsers[self.parser](response.json())
+            if not data:
+                error = "返回数据格式不正确"
+        except requests.exceptions.RequestException as e:
+            error = f"请求异常: {str(e)}"
+        except ValueError as e:
+            error = f"JSON解析异常: {str(e)}"
+
+        with self._lock:
+            self.requests += 1
+            self._latencies.append(time.time() - start)
+            if error:
+                self.failures += 1
+                self.last_error = error
+
+        if error:
+            log.print_log(f"热榜数据源 {self.name} {error}")
+            return None
+        return data
+
+    def get_stats(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            return {
+                "url": self.url,
+                "requests": self.requests,
+                "failures": self.failures,
+                "avg_latency": sum(latencies) / len(latencies) if latencies else None,
+                "p50_latency": latencies[len(latencies) // 2] if latencies else None,
+                "last_error": self.last_error,
+            }
+
+
+def merge_hotnews(results):
+    """合并多个数据源的结果，同名平台按先到的数据源顺序合并、去重"""
+    merged = {}
+    titles = {}
+    for result in results:
+        for platform in result:
+            name = platform.get("name")
+            if not name:
+                continue
+            if name not in merged:
+                # 保留平台的其他字段（如 update_time）
+                merged[name] = {**platform, "data": []}
+                titles[name] = set()
+            for item in platform.get("data") or []:
+                title = item.get("title")
+                if title and title not in titles[name]:
+                    titles[name].add(title)
+                    merged[name]["data"].append(item)
+
+    return list(merged.values())
+
+
+class HotnewsAggregator:
+    """
+    并发请求多个热榜数据源：
+    - 收到 quorum 个有效结果即返回，其余请求在后台完成后丢弃
+    - 超过 timeout 仍不足 quorum 时，返回已经收到的结果
+    - 上次的请求还未结束的数据源不重复请求，继续等待上次的结果，
+      每个数据源最多占用一个线程，卡住的请求不会占满线程池
+    """
+
+    def __init__(self, providers, quorum=1, timeout=10):
+        if not providers:
+            raise ValueError("至少需要配置一个热榜数据源")
+        self.providers = providers
+        self.quorum = max(1, min(quorum, len(providers)))
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=len(providers), thread_name_prefix="hotnews"
+        )
+        self._lock = threading.Lock()
+        self._running = {}  # 数据源 -> 未结束的请求
+
+    def _submit(self, provider):
+        with self._lock:
+            future = self._running.get(provider)
+            if future is None or future.done():
+                future = self._running[provider] = self._executor.submit(provider.fetch)
+            return future
+
+    def fetch(self) -> Optional[List[Dict]]:
+        futures = {self._submit(p): p for p in self.providers}
+        results = []
+        try:
+            for future in as_completed(futures, timeout=self.timeout):
+                data = future.result()
+                if data:
+                    results.append(data)
+                    if len(results) >= self.quorum:
+                        break
+        except TimeoutError:
+            log.print_log(f"热榜数据源请求超时，已获取 {len(results)} 个结果")
+
+        if not results:
+            return None
+        return merge_hotnews(results)
+
+    def get_stats(self):
+        return {p.name: p.get_stats() for p in self.providers}
@@ -0,0 +1,135 @@
+import time
+import sqlite3
+import threading
+
+from src.ai_auto_wxgzh.utils import log
+from src.ai_auto_wxgzh.utils import utils
+
+
+class HotnewsStore:
+    """
+    热榜快照时间序列存储（SQLite）：
+    - 每次拉取到的热榜按 平台/话题/排名/时间 追加保存
+    - 超过 downsample_after 的数据每小时只保留一条，超过 retention 的数据删除，控制磁盘占用
+    - 支持按时间范围查询话题排名变化，计算排名上升速度
+    """
+
+    MAINTAIN_INTERVAL = 3600  # 整理数据的最小间隔（秒）
+
+    def __init__(self, db_file, retention_days=30, downsample_after_hours=24):
+        self.db_file = db_file
+        self.retention = retention_days * 24 * 3600
+        self.downsample_after = downsample_after_hours * 3600
+        self._last_maintain = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, timeout=10, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS snapshots (
+                ts INTEGER NOT NULL,
+                platform TEXT NOT NULL,
+                key TEXT NOT NULL,
+                title TEXT NOT NULL,
+                rank INTEGER NOT NULL,
+                UNIQUE (platform, key, ts)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_ts ON snapshots (ts)")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_snapshots_key ON snapshots (key, platform, ts)"
+        )
+        self._conn.commit()
+
+    def append(self, hotnews, timestamp=None):
+        """追加一次热榜快照，同一时间戳重复追加会被忽略"""
+        ts = int(timestamp or time.time())
+        rows = []
+        for platform in hotnews or []:
+            seen = set()
+            for rank, item in enumerate(platform.get("data") or []):
+                title = item.get("title")
+                key = utils.normalize_title(title)
+                if not key or key in seen:
+                    continue
+                seen.add(key)
+                rows.append((ts, platform.get("name"), key, title, rank))
+
+        try:
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO snapshots (ts, platform, key, title, rank) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._conn.commit()
+            self.maintain()
+        except sqlite3.Error as e:
+            log.print_log(f"保存热榜快照失败: {str(e)}")
+
+    def maintain(self, force=False):
+        """降采样并删除过期数据"""
+        now = time.time()
+        if not force and now - self._last_maintain < self.MAINTAIN_INTERVAL:
+            return
+        self._last_maintain = now
+
+        with self._lock:
+            self._conn.execute("DELETE FROM snapshots WHERE ts < ?", (int(now - self.retention),))
+            # 较早的数据每小时只保留最早的一条
+            self._conn.execute(
+                """
+                DELETE FROM snapshots WHERE ts < ? AND rowid NOT IN (
+                    SELECT MIN(rowid) FROM snapshots WHERE ts < ?
+                    GROUP BY platform, key, ts / 3600
+                )
+                """,
+                (int(now - self.downsample_after), int(now - self.downsample_after)),
+            )
+            self._conn.commit()
+
+    def history(self, key, since, until=None, platform=None):
+        """查询话题在时间范围内的排名记录，返回 [(ts, platform, rank), ...]"""
+        sql = "SELECT ts, platform, rank FROM snapshots WHERE key = ? AND ts >= ? AND ts <= ?"
+        params = [utils.normalize_title(key), int(since), int(until or time.time())]
+        if platform:
+            sql += " AND platform = ?"
+            params.append(platform)
+        with self._lock:
+            return self._conn.execute(sql + " ORDER BY ts", params).fetchall()
+
+    def velocities(self, window_hours=3, now=None, min_observations=2, min_span=600):
+        """
+        计算窗口期内每个话题的排名上升速度（名次/小时），返回 {(平台, 标准化标题): 速度}
+        以窗口内第一次和最近一次的排名计算（窗口内新上榜的话题从第一次出现时算起）；
+        出现次数少于 min_observations 或时间跨度不足 min_span 秒的话题没有速度
+        """
+        now = int(now or time.time())
+        since = now - int(window_hours * 3600)
+        with self._lock:
+            # SQLite 中与 MIN/MAX 同时查询的列取自该最值所在的行
+            first = self._conn.execute(
+                "SELECT platform, key, rank, MIN(ts) FROM snapshots "
+                "WHERE ts >= ? AND ts <= ? GROUP BY platform, key",
+                (since, now),
+            ).fetchall()
+            last = self._conn.execute(
+                "SELECT platform, key, rank, MAX(ts), COUNT(*) FROM snapshots "
+                "WHERE ts >= ? AND ts <= ? GROUP BY platform, key",
+                (since, now),
+            ).fetchall()
+
+        first_rank = {(p, k): (rank, ts) for p, k, rank, ts in first}
+        result = {}
+        for platform, key, rank, ts, count in last:
+            start_rank, start_ts = first_rank[(platform, key)]
+            if count < min_observations or ts - start_ts < max(min_span, 1):
+                continue
+            result[(platform, key)] = (start_rank - rank) / ((ts - start_ts) / 3600)
+        return result
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,40 @@
+import math
+import random
+
+
+class ModuleSelector:
+    """
+    按 Thompson 采样选择搜索模块：
+    - 每次搜索的收益综合是否成功、有效结果数和耗时，取值 0~1
+    - 收益按时间指数衰减后累计（见 ModuleStats），旧的表现逐渐被遗忘
+    - 每个模块的收益服从 Beta(1 + 收益, 1 + 次数 - 收益)，每次从中采样排序，
+      数据少的新模块方差大，仍有机会被选中
+    """
+
+    def __init__(self, stats, reference_latency=10.0, rng=None):
+        self.stats = stats
+        self.reference_latency = reference_latency  # 耗时等于该值时，耗时部分得一半分
+        self.rng = rng or random.Random()
+
+    def reward(self, success, latency, result_count, target):
+        """计算一次搜索的收益：失败为 0，成功时 0.4 基础分 + 0.4 结果数 + 0.2 耗时"""
+        if not success:
+            return 0.0
+        fill = min(result_count / target, 1.0) if target else 1.0
+        speed = self.reference_latency / (self.reference_latency + max(latency, 0))
+        return 0.4 + 0.4 * fill + 0.2 * speed
+
+    def _beta_params(self, module_id):
+        reward, trials = self.stats.get_reward(module_id)
+        return 1 + reward, 1 + max(trials - reward, 0)
+
+    def sample(self, module_id):
+        """从模块收益的后验分布中采样一次"""
+        return self.rng.betavariate(*self._beta_params(module_id))
+
+    def posterior(self, module_id):
+        """返回 (收益期望, 标准差, 衰减后的次数)"""
+        a, b = self._beta_params(module_id)
+        mean = a / (a + b)
+        std = math.sqrt(a * b / ((a + b) ** 2 * (a + b + 1)))
+        return mean, std, a + b - 2
@@ -0,0 +1,256 @@
+"""
+网页摘要和发布日期提取
+
+提取器按注册顺序依次执行，返回第一个有效结果：
+- 日期：站点规则 -> meta 标签 -> JSON-LD -> <time> 标签 -> 正文文本
+- 摘要：站点规则 -> meta 描述（不少于100字） -> 正文段落 -> 较短的 meta 描述 -> 页面标题
+新的提取方式通过 register_date_extractor / register_abstract_extractor 注册，
+常见新闻站点的规则通过 register_site_rule 注册
+"""
+
+import re
+from datetime import date, datetime
+from urllib.parse import urlsplit
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml  # noqa: F401
+
+    HTML_PARSER = "lxml"  # 比 html.parser 快很多
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+
+class Page:
+    """待提取的网页：解析后的 soup、原始 HTML 和域名"""
+
+    def __init__(self, html, url=None, parser=HTML_PARSER):
+        self.html = html
+        self.host = (urlsplit(url).hostname or "") if url else ""
+        self.soup = BeautifulSoup(html, parser)
+
+    def site_rule(self):
+        """返回匹配该域名（含子域名）的站点规则"""
+        for domain, rule in _site_rules.items():
+            if self.host == domain or self.host.endswith("." + domain):
+                return rule
+        return None
+
+
+# 提取器注册表：[(名称, 函数(Page) -> str 或 None)]，按注册顺序执行
+_date_extractors = []
+_abstract_extractors = []
+# 站点规则：域名 -> {"date": CSS选择器, "abstract": CSS选择器}
+_site_rules = {}
+
+
+def register_date_extractor(name):
+    """注册发布日期提取器，函数返回日期文本（无需标准化）或 None"""
+
+    def decorator(func):
+        _date_extractors.append((name, func))
+        return func
+
+    return decorator
+
+
+def register_abstract_extractor(name):
+    """注册摘要提取器，函数返回摘要文本或 None"""
+
+    def decorator(func):
+        _abstract_extractors.append((name, func))
+        return func
+
+    return decorator
+
+
+def register_site_rule(domain, date=None, abstract=None):
+    """注册站点规则，date/abstract 为 CSS 选择器"""
+    _site_rules[domain] = {"date": date, "abstract": abstract}
+
+
+# 常见中文新闻站点
+register_site_rule(
+    "sina.com.cn", date=".date-source .date, span.date", abstract="#article p, #artibody p"
+)
+register_site_rule("163.com", date=".post_info, .post_time_source", abstract=".post_body p")
+register_site_rule("sohu.com", date="#news-time", abstract="article.article p")
+# 新华网新版页面 .header-time 的年、月日分开显示，不能识别时使用移动版头部的 .mheader .info
+_XINHUA_DATE = "#pubtime, .header-time, .mheader .info, .h-time"
+register_site_rule("news.cn", date=_XINHUA_DATE, abstract="#detail p, #p-detail p")
+register_site_rule("xinhuanet.com", date=_XINHUA_DATE, abstract="#detail p, #p-detail p")
+register_site_rule(
+    "people.com.cn", date=".col-1-1, .box01 .fl", abstract=".rm_txt_con p, #rwb_zw p"
+)
+
+
+# 日期文本：YYYY-MM-DD、YYYY/MM/DD、YYYY.MM.DD、YYYY年MM月DD日、MM/DD/YYYY、YYYYMMDD
+_DATE_YMD = re.compile(r"((?:19|20)\d{2})\s*[-/.年]\s*(\d{1,2})\s*[-/.月]\s*(\d{1,2})")
+_DATE_MDY = re.compile(r"\b(\d{1,2})/(\d{1,2})/((?:19|20)\d{2})\b")
+_DATE_COMPACT = re.compile(r"\b((?:19|20)\d{2})(\d{2})(\d{2})\b")
+_TIMESTAMP = re.compile(r"^\d{10}(?:\d{3})?$")
+_JSON_LD_DATE = re.compile(r'"datePublished"\s*:\s*"([^"]+)"')
+_CONTENT_CLASS = re.compile("article|content|post|entry")
+
+_META_DATE_ATTRS = (
+    {"property": "article:published_time"},
+    {"itemprop": "datePublished"},
+    {"name": "pubdate"},
+    {"name": "publishdate"},
+    {"name": "PubDate"},
+    {"name": "og:time"},
+    {"name": "apub:time"},
+)
+_META_DESC_ATTRS = ({"name": "description"}, {"property": "og:description"})
+
+
+def _valid_date(year, month, day):
+    try:
+        return date(int(year), int(month), int(day)).isoformat()
+    except ValueError:
+        return None
+
+
+def normalize_date(text):
+    """把各种格式的日期文本标准化为 YYYY-MM-DD，无法识别返回 None"""
+    if not text:
+        return None
+    text = str(text).strip()
+
+    if _TIMESTAMP.match(text):
+        return datetime.fromtimestamp(int(text[:10])).date().isoformat()
+
+    match = _DATE_YMD.search(text)
+    if match:
+        return _valid_date(*match.groups())
+    match = _DATE_MDY.search(text)
+    if match:
+        month, day, year = match.groups()
+        return _valid_date(year, month, day)
+    match = _DATE_COMPACT.search(text)
+    if match:
+        return _valid_date(*match.groups())
+    return None
+
+
+@register_date_extractor("site_rule")
+def _date_from_site_rule(page):
+    # 选择器匹配多个元素时（按文档顺序）返回第一个能识别为日期的
+    rule = page.site_rule()
+    if not rule or not rule["date"]:
+        return None
+    for element in page.soup.select(rule["date"]):
+        text = element.get_text(" ", strip=True)
+        if normalize_date(text):
+            return text
+    return None
+
+
+@register_date_extractor("meta")
+def _date_from_meta(page):
+    for attrs in _META_DATE_ATTRS:
+        meta = page.soup.find("meta", attrs=attrs)
+        if meta and meta.get("content"):
+            return meta["content"]
+    return None
+
+
+@register_date_extractor("json_ld")
+def _date_from_json_ld(page):
+    match = _JSON_LD_DATE.search(page.html)
+    return match.group(1) if match else None
+
+
+@register_date_extractor("time_tag")
+def _date_from_time_tag(page):
+    time_tag = page.soup.find("time")
+    if time_tag:
+        return time_tag.get("datetime") or time_tag.get_text(strip=True)
+    return None
+
+
+@register_date_extractor("text")
+def _date_from_text(page):
+    # 只在正文文本中查找，避免匹配到脚本和链接里的数字
+    body = page.soup.body or page.soup
+    text = body.get_text(" ", strip=True)
+    for pattern in (_DATE_YMD, _DATE_MDY):
+        for match in pattern.finditer(text):
+            if normalize_date(match.group(0)):
+                return match.group(0)
+    return None
+
+
+def _join_paragraphs(paragraphs):
+    content = []
+    for p in paragraphs:
+        text = p.get_text().strip()
+        if len(text) > 30:  # 忽略太短的段落
+            content.append(text)
+    return " ".join(content[:3])[:500] if content else None  # 取前三段，最多500字
+
+
+@register_abstract_extractor("site_rule")
+def _abstract_from_site_rule(page):
+    rule = page.site_rule()
+    if rule and rule["abstract"]:
+        return _join_paragraphs(page.soup.select(rule["abstract"]))
+    return None
+
+
+@register_abstract_extractor("meta")
+def _abstract_from_meta(page):
+    for attrs in _META_DESC_ATTRS:
+        meta = page.soup.find("meta", attrs=attrs)
+        content = (meta.get("content") or "").strip() if meta else ""
+        if len(content) >= 100:
+            return content
+    return None
+
+
+@register_abstract_extractor("paragraphs")
+def _abstract_from_paragraphs(page):
+    article = page.soup.find("article") or page.soup.find(class_=_CONTENT_CLASS)
+    paragraphs = article.find_all("p") if article else page.soup.find_all("p")
+    return _join_paragraphs(paragraphs)
+
+
+@register_abstract_extractor("short_meta")
+def _abstract_from_short_meta(page):
+    # 正文提取不到时，较短的 meta 描述也可以使用
+    for attrs in _META_DESC_ATTRS:
+        meta = page.soup.find("meta", attrs=attrs)
+        if meta and (meta.get("content") or "").strip():
+            return meta["content"].strip()
+    return None
+
+
+@register_abstract_extractor("title")
+def _abstract_from_title(page):
+    title_tag = page.soup.find("title")
+    if title_tag and title_tag.get_text(strip=True):
+        return f"页面标题: {title_tag.get_text(strip=True)}"
+    return None
+
+
+def extract_date(page):
+    for _, extractor in _date_extractors:
+        pub_date = normalize_date(extractor(page))
+        if pub_date:
+            return pub_date
+    return None
+
+
+def extract_abstract(page):
+    for _, extractor in _abstract_extractors:
+        abstract = extractor(page)
+        if abstract:
+            return abstract
+    return ""
+
+
+def extract(html, url=None):
+    """从网页内容（可以只是开头部分）提取 (摘要, 发布日期YYYY-MM-DD)"""
+    page = Page(html, url)
+    return extract_abstract(page), extract_date(page)
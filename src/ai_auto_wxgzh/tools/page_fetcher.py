@@ -0,0 +1,215 @@
+import re
+import time
+import codecs
+import collections
+import threading
+from urllib.parse import urlsplit
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.ai_auto_wxgzh.utils import http_replay
+
+
+_HEADER_CHARSET = re.compile(r"charset=[\"']?([\w-]+)", re.I)
+_META_CHARSET = re.compile(rb"<meta[^>]+charset=[\"']?\s*([\w-]+)", re.I)
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/91.0.4472.124 Safari/537.36"
+}
+
+
+def decode_html(data, content_type=None):
+    """按 响应头 -> meta 标签 -> UTF-8 -> GB18030 的顺序确定编码并解码"""
+    candidates = []
+    match = _HEADER_CHARSET.search(content_type or "")
+    if match:
+        candidates.append(match.group(1))
+    match = _META_CHARSET.search(data[:4096])
+    if match:
+        candidates.append(match.group(1).decode("ascii"))
+    candidates += ["utf-8", "gb18030"]
+
+    for encoding in candidates:
+        try:
+            codecs.lookup(encoding)
+        except LookupError:
+            continue
+        if encoding.lower() in ("gb2312", "gbk"):
+            encoding = "gb18030"  # 兼容超出 GB2312/GBK 的字符
+        try:
+            # 增量解码，忽略截断处不完整的多字节字符
+            return codecs.getincrementaldecoder(encoding)().decode(data, final=False)
+        except UnicodeDecodeError:
+            continue
+    return data.decode("utf-8", errors="replace")
+
+
+class PageFetcher:
+    """
+    抓取搜索结果网页（补全摘要和发布时间）：
+    - 进程内共享一个 Session 和线程池，跨搜索复用连接（keep-alive）
+    - 总并发不超过 max_workers，同一站点并发不超过 per_host，map 按站点排队提交
+    - map 受截止时间约束，到期仍未完成的条目原样返回
+    - get_html_head 流式读取网页开头，读到所需内容或达到大小上限即停止
+    """
+
+    def __init__(
+        self,
+        max_workers=10,
+        per_host=2,
+        connect_timeout=3.05,
+        read_timeout=8,
+        max_page_bytes=512 * 1024,
+    ):
+        self.per_host = per_host
+        self.max_page_bytes = max_page_bytes
+        self.timeout = (connect_timeout, read_timeout)
+
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch")
+        self._lock = threading.Lock()
+        self._host_limits = {}
+
+    def _host_limit(self, url):
+        host = urlsplit(url).hostname or ""
+        with self._lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_limits[host]
+
+    def get(self, url, deadline_at=None, **kwargs):
+        """GET 请求，等待站点并发名额和读取超时都不超过截止时间（time.monotonic()）"""
+        timeout = self.timeout
+        remaining = None
+        if deadline_at is not None:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"已超过截止时间: {url}")
+            timeout = (min(timeout[0], remaining), min(timeout[1], remaining))
+
+        limit = self._host_limit(url)
+        # 没有截止时间时一直等待名额（timeout=None），不能传 -1（不阻塞，立即失败）
+        if not limit.acquire(timeout=remaining):
+            raise TimeoutError(f"等待站点并发名额超时: {url}")
+        try:
+            return http_replay.get(url, session=self.session, timeout=timeout, **kwargs)
+        finally:
+            limit.release()
+
+    def get_html_head(self, url, deadline_at=None, paragraphs=3, **kwargs):
+        """
+        流式读取网页：读到 </head> 之后再有 paragraphs 个段落、达到 max_page_bytes 或截止时间即停止
+        返回 (response, 解码后的部分HTML)，非 200 响应返回空字符串
+        """
+        response = self.get(url, deadline_at, stream=True, **kwargs)
+        try:
+            if response.status_code != 200:
+                return response, ""
+
+            data = bytearray()
+            head_end = -1
+            for chunk in response.iter_content(chunk_size=16 * 1024):
+                scan_from = max(len(data) - 8, 0)  # 标签可能跨块
+                data += chunk
+                if head_end < 0:
+                    head_end = data.find(b"</head", scan_from)
+                if head_end >= 0 and data.count(b"</p>", head_end) >= paragraphs:
+                    break
+                if len(data) >= self.max_page_bytes:
+                    break
+                if deadline_at is not None and time.monotonic() >= deadline_at:
+                    break
+
+            return response, decode_html(bytes(data), response.headers.get("Content-Type"))
+        finally:
+            response.close()
+
+    def _submit_by_host(self, fn, items, url):
+        """
+        按站点排队提交 fn(item)，返回与 items 一一对应的 Future：
+        同一站点同时提交的任务不超过 per_host，其余任务等该站点的任务完成后再提交，
+        不会占用线程等待站点并发名额；url(item) 为空的条目直接提交
+        """
+        futures = []
+        queues = {}
+        for item in items:
+            item_url = url(item)
+            if item_url:
+                future = Future()
+                host = urlsplit(item_url).hostname or ""
+                queues.setdefault(host, collections.deque()).append((future, item))
+            else:
+                future = self._executor.submit(fn, item)
+            futures.append(future)
+        lock = threading.Lock()
+
+        def submit_next(queue):
+            with lock:
+                while queue:
+                    future, item = queue.popleft()
+                    if future.set_running_or_notify_cancel():  # 到截止时间已取消的跳过
+                        break
+                else:
+                    return
+            try:
+                task = self._executor.submit(fn, item)
+            except RuntimeError as e:  # 线程池已关闭
+                future.set_exception(e)
+                return
+            task.add_done_callback(lambda task: finish(task, future, queue))
+
+        def finish(task, future, queue):
+            try:
+                future.set_result(task.result())
+            except BaseException as e:
+                future.set_exception(e)
+            submit_next(queue)
+
+        # 各站点轮流提交，先提交的不会都来自同一站点
+        for _ in range(self.per_host):
+            for queue in queues.values():
+                submit_next(queue)
+        return futures
+
+    def map(self, fn, items, deadline_at=None, url=None):
+        """
+        并发执行 fn(item)，出错或到截止时间仍未完成的条目原样返回
+        传入 url(item)（返回条目要抓取的网址）时按站点排队提交，见 _submit_by_host
+        """
+        if url is None:
+            futures = [self._executor.submit(fn, item) for item in items]
+        else:
+            futures = self._submit_by_host(fn, items, url)
+        timeout = None if deadline_at is None else max(deadline_at - time.monotonic(), 0)
+        wait(futures, timeout=timeout)
+
+        results = []
+        for future, item in zip(futures, items):
+            if future.done() and not future.cancelled() and future.exception() is None:
+                results.append(future.result())
+            else:
+                future.cancel()
+                results.append(item)
+        return results
+
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+
+def get_page_fetcher():
+    """获取进程内共享的网页抓取器"""
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            _fetcher = PageFetcher()
+        return _fetcher
@@ -0,0 +1,288 @@
+import os
+import re
+import json
+import time
+import functools
+import itertools
+import sqlite3
+import threading
+from pathlib import Path
+
+from src.ai_auto_wxgzh.utils import utils
+from src.ai_auto_wxgzh.tools.topic_history import hamming_distance, simhash
+
+try:
+    import opencc
+
+    _t2s_converter = opencc.OpenCC("t2s")
+except Exception:  # 未安装 opencc 时使用内置的常用字对照表
+    _t2s_converter = None
+
+_LEGACY_KEY = re.compile(r"^(.*)_(\d+)$")  # 旧版缓存键 "{话题}_{max_results}"
+
+
+@functools.lru_cache(maxsize=1)
+def _t2s_table():
+    """内置的常用繁体字 -> 简体字对照表（data/t2s_chars.txt，每行 繁体字<Tab>简体字），只加载一次"""
+    path = utils.get_res_path("data/t2s_chars.txt", os.path.dirname(__file__))
+    pairs = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#") or "\t" not in line:
+                continue
+            traditional, simplified = line.rstrip("\n").split("\t", 1)
+            pairs[traditional] = simplified
+    return str.maketrans(pairs)
+
+
+def normalize_topic(topic):
+    """标准化搜索话题作为缓存键：全半角、大小写、标点/空白/表情、繁简体差异都不影响"""
+    key = utils.normalize_title(topic)
+    if _t2s_converter is not None:
+        return _t2s_converter.convert(key)
+    return key.translate(_t2s_table())
+
+
+def jaccard_similarity(a, b, ngram=2):
+    """字符 n-gram 的 Jaccard 相似度"""
+    grams_a = {a[i : i + ngram] for i in range(max(len(a) - ngram + 1, 1))}
+    grams_b = {b[i : i + ngram] for i in range(max(len(b) - ngram + 1, 1))}
+    return len(grams_a & grams_b) / len(grams_a | grams_b)
+
+
+class SearchCache:
+    """
+    基于 SQLite 的搜索结果缓存：
+    - 按键读写为 O(1) 的主键查询，不再整文件读写
+    - expires_at 建有索引，每次写入时增量清理少量过期条目
+    - 每写入 EVICT_INTERVAL 次检查一次条目数，超过 max_entries 时按最近访问时间淘汰（LRU）
+    - 命中时的访问时间先在内存中累积，写入时或累积到 ACCESS_FLUSH_SIZE 条时批量更新
+    - WAL 模式 + 忙等待超时，支持多个进程同时访问
+    - 可选保存键的 SimHash（分 8 段建索引），用于查找近似键（汉明距离不超过 7）
+    - 命中/未命中次数持久保存，便于评估缓存效果
+    """
+
+    EVICT_BATCH = 100  # 每次写入最多清理的过期条目数
+    EVICT_INTERVAL = 64  # 每写入多少次检查一次条目数
+    ACCESS_FLUSH_SIZE = 100  # 累积多少条访问时间后批量更新
+    BANDS = 8
+    BAND_BITS = 8
+
+    def __init__(self, db_file, max_entries=5000, default_ttl=3600 * 24, legacy_json_file=None):
+        self.db_file = str(db_file)
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._local = threading.local()
+        self._puts = itertools.count()
+        self._accessed = {}  # 键 -> 还未写入数据库的最近访问时间
+        self._accessed_lock = threading.Lock()
+
+        conn = self._conn()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                timestamp REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache (expires_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_access ON cache (last_access)")
+
+        # 旧版数据库没有 SimHash 分段列
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(cache)")}
+        for band in range(self.BANDS):
+            if f"band{band}" not in columns:
+                conn.execute(f"ALTER TABLE cache ADD COLUMN band{band} INTEGER")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_cache_band{band} ON cache (band{band})")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, count INTEGER NOT NULL)"
+        )
+        conn.commit()
+
+        if legacy_json_file:
+            self._migrate(Path(legacy_json_file))
+
+    def _conn(self):
+        # sqlite3 连接不能跨线程共享，每个线程使用独立连接
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _migrate(self, json_file):
+        """
+        导入旧版 search_cache.json，导入后改名，避免重复导入
+        旧版的键为 "{话题}_{max_results}"，按 normalize_topic 重新生成键和 SimHash，
+        同一话题有多条时保留请求条数最多（相同时最新）的一条
+        """
+        if not json_file.exists():
+            return
+        try:
+            with open(json_file, "r", encoding="utf-8") as f:
+                legacy = json.load(f)
+        except Exception:
+            return
+
+        now = time.time()
+        entries = {}  # 新键 -> (max_results, timestamp, 数据)
+        for key, data in legacy.items():
+            if not isinstance(data, dict) or not isinstance(data.get("results"), list):
+                continue
+            try:
+                timestamp = float(data.get("timestamp", 0))
+            except (TypeError, ValueError):
+                timestamp = 0
+            match = _LEGACY_KEY.match(key)
+            topic = match.group(1) if match else key
+            # 旧版结果没有截止时间，结果数少于请求条数也是完整结果；没有后缀时按结果数计算
+            max_results = int(match.group(2)) if match else len(data["results"])
+            data["max_results"] = max_results
+            new_key = normalize_topic(topic) or topic
+            if new_key not in entries or entries[new_key][:2] < (max_results, timestamp):
+                entries[new_key] = (max_results, timestamp, data)
+
+        rows = [
+            (
+                key,
+                json.dumps(data, ensure_ascii=False),
+                timestamp,
+                timestamp + self.default_ttl,
+                now,
+                *self._bands(simhash(key)),
+            )
+            for key, (_, timestamp, data) in entries.items()
+        ]
+        band_columns = ", ".join(f"band{i}" for i in range(self.BANDS))
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                f"INSERT OR IGNORE INTO cache "
+                f"(key, value, timestamp, expires_at, last_access, {band_columns}) "
+                f"VALUES (?, ?, ?, ?, ?{', ?' * self.BANDS})",
+                rows,
+            )
+        try:
+            json_file.replace(json_file.with_suffix(".json.migrated"))
+        except OSError:  # 其他进程已经导入并改名
+            pass
+
+    def get(self, key, max_age=None):
+        """读取缓存，超过 max_age（秒）或已过期返回 None"""
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT value, timestamp FROM cache WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+
+        value, timestamp = row
+        if max_age is not None and now - timestamp >= max_age:
+            return None
+
+        with self._accessed_lock:
+            self._accessed[key] = now
+            flush = len(self._accessed) >= self.ACCESS_FLUSH_SIZE
+        if flush:
+            with conn:
+                self._flush_access(conn)
+        return json.loads(value)
+
+    def _flush_access(self, conn):
+        """把累积的访问时间写入数据库（在调用方的事务中执行）"""
+        with self._accessed_lock:
+            accessed, self._accessed = self._accessed, {}
+        if accessed:
+            conn.executemany(
+                "UPDATE cache SET last_access = MAX(last_access, ?) WHERE key = ?",
+                [(t, key) for key, t in accessed.items()],
+            )
+
+    def _bands(self, fingerprint):
+        mask = (1 << self.BAND_BITS) - 1
+        return [(fingerprint >> (i * self.BAND_BITS)) & mask for i in range(self.BANDS)]
+
+    def put(self, key, value, ttl=None, fingerprint=None):
+        """写入缓存，ttl 秒后过期；fingerprint 为键的 64 位 SimHash，用于近似查找"""
+        now = time.time()
+        ttl = ttl or self.default_ttl
+        bands = self._bands(fingerprint) if fingerprint is not None else [None] * self.BANDS
+        band_columns = ", ".join(f"band{i}" for i in range(self.BANDS))
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO cache "
+                f"(key, value, timestamp, expires_at, last_access, {band_columns}) "
+                f"VALUES (?, ?, ?, ?, ?{', ?' * self.BANDS})",
+                (key, json.dumps(value, ensure_ascii=False), now, now + ttl, now, *bands),
+            )
+            self._flush_access(conn)
+            self._evict(conn, now)
+
+    def find_similar(self, fingerprint, max_distance=7, max_age=None):
+        """
+        查找 SimHash 汉明距离不超过 max_distance（不大于 BANDS - 1）的未过期条目
+        返回 [(key, value, 距离)]，按距离排序
+        """
+        now = time.time()
+        band_columns = ", ".join(f"band{i}" for i in range(self.BANDS))
+        band_match = " OR ".join(f"band{i} = ?" for i in range(self.BANDS))
+        rows = self._conn().execute(
+            f"SELECT key, value, timestamp, {band_columns} FROM cache "
+            f"WHERE ({band_match}) AND expires_at > ?",
+            (*self._bands(fingerprint), now),
+        )
+
+        matches = []
+        for key, value, timestamp, *row_bands in rows:
+            if max_age is not None and now - timestamp >= max_age:
+                continue
+            other = sum(band << (i * self.BAND_BITS) for i, band in enumerate(row_bands))
+            distance = hamming_distance(fingerprint, other)
+            if distance <= max_distance:
+                matches.append((key, json.loads(value), distance))
+        return sorted(matches, key=lambda m: m[2])
+
+    def count(self, name):
+        """累加统计计数（如 hits、misses）"""
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT INTO stats (name, count) VALUES (?, 1) "
+                "ON CONFLICT(name) DO UPDATE SET count = count + 1",
+                (name,),
+            )
+
+    def get_stats(self):
+        return dict(self._conn().execute("SELECT name, count FROM stats").fetchall())
+
+    def _evict(self, conn, now):
+        conn.execute(
+            "DELETE FROM cache WHERE key IN "
+            "(SELECT key FROM cache WHERE expires_at <= ? ORDER BY expires_at LIMIT ?)",
+            (now, self.EVICT_BATCH),
+        )
+        if next(self._puts) % self.EVICT_INTERVAL:
+            return
+        overflow = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM cache WHERE key IN "
+                "(SELECT key FROM cache ORDER BY last_access LIMIT ?)",
+                (overflow,),
+            )
+
+    def delete(self, key):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import atexit
+import threading
+from collections import deque, Counter
+from pathlib import Path
+
+
+class ErrorJournal:
+    """
+    搜索错误日志（JSONL，只追加）：
+    - 每条错误追加一行，不再整文件重写
+    - 批量 fsync：每 fsync_every 条或 fsync_interval 秒落盘一次，退出时再落盘
+    - 文件超过 max_bytes 或 max_age 后轮转，只保留 backup_count 个历史文件
+    - 内存中保留最近 window 内的错误，按模块统计错误次数，无需读取全部历史
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(
+        self,
+        journal_file,
+        max_bytes=1024 * 1024,
+        max_age=7 * 24 * 3600,
+        backup_count=5,
+        window=24 * 3600,
+        fsync_every=20,
+        fsync_interval=5,
+    ):
+        self.journal_file = Path(journal_file)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.backup_count = backup_count
+        self.window = window
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+
+        self._lock = threading.Lock()
+        self._recent = deque()  # (timestamp, module)
+        self._file = None
+        self._created = None  # 当前文件首条记录的时间
+        self._pending = 0
+        self._last_fsync = time.time()
+
+        self._load_recent()
+        atexit.register(self.close)
+
+    @classmethod
+    def get_instance(cls, journal_file, **kwargs):
+        """获取指定文件的错误日志（进程内共享，避免多个实例同时追加同一文件）"""
+        key = str(Path(journal_file).resolve())
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(journal_file, **kwargs)
+            return cls._instances[key]
+
+    def _rotated_files(self):
+        pattern = f"{self.journal_file.stem}.*{self.journal_file.suffix}"
+        return sorted(self.journal_file.parent.glob(pattern))
+
+    def _load_recent(self):
+        """只读取修改时间在统计窗口内的文件"""
+        since = time.time() - self.window
+        files = self._rotated_files() + [self.journal_file]
+        for path in files:
+            if not path.exists() or path.stat().st_mtime < since:
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # 异常退出时可能写入了不完整的行
+                    if entry.get("timestamp", 0) >= since:
+                        self._recent.append((entry["timestamp"], entry.get("module")))
+
+    def _open(self):
+        if self._file is None:
+            self._created = time.time()
+            if self.journal_file.exists():
+                # 文件首行的时间作为文件创建时间
+                with open(self.journal_file, "r", encoding="utf-8") as f:
+                    try:
+                        self._created = json.loads(f.readline()).get("timestamp", self._created)
+                    except ValueError:
+                        pass
+            self._file = open(self.journal_file, "a", encoding="utf-8")
+        return self._file
+
+    def _should_rotate(self):
+        return (
+            self._file.tell() >= self.max_bytes or time.time() - self._created >= self.max_age
+        )
+
+    def _rotate(self):
+        self._sync(force=True)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        rotated = self.journal_file.with_name(
+            f"{self.journal_file.stem}.{int(time.time() * 1000)}{self.journal_file.suffix}"
+        )
+        os.replace(self.journal_file, rotated)
+        for old in self._rotated_files()[: -self.backup_count or None]:
+            old.unlink(missing_ok=True)
+
+    def _sync(self, force=False):
+        if self._file is None or self._pending == 0:
+            return
+        now = time.time()
+        due = self._pending >= self.fsync_every or now - self._last_fsync >= self.fsync_interval
+        if force or due:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._pending = 0
+            self._last_fsync = now
+
+    def append(self, entry):
+        """追加一条错误记录，entry 需包含 timestamp 和 module"""
+        with self._lock:
+            f = self._open()
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()  # 写入系统缓冲，其他进程可见；fsync 批量进行
+            self._pending += 1
+            self._sync()
+
+            self._recent.append((entry["timestamp"], entry.get("module")))
+            self._prune()
+
+            if self._should_rotate():
+                self._rotate()
+
+    def _prune(self):
+        since = time.time() - self.window
+        while self._recent and self._recent[0][0] < since:
+            self._recent.popleft()
+
+    def error_counts(self, window=None):
+        """统计最近 window 秒内每个模块的错误次数（window 不能超过初始化时的统计窗口）"""
+        since = time.time() - min(window or self.window, self.window)
+        with self._lock:
+            self._prune()
+            return Counter(module for ts, module in self._recent if ts >= since)
+
+    def close(self):
+        with self._lock:
+            self._sync(force=True)
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,198 @@
+"""
+合并多个搜索模块的结果（在补全摘要和发布时间之前执行，减少需要抓取的网页）：
+- URL 标准化：去掉 utm_*/spm 等跟踪参数和锚点，统一域名大小写和移动版前缀（m./wap./3g.）
+- 标准化 URL 相同，或标题+摘要的 SimHash 汉明距离不超过 max_distance 的结果视为同一条，
+  合并时补全缺失的字段
+- 按时效性（发布时间，半衰期 freshness_half_life 天）和来源权威度排序
+来源权威度通过 register_authority 注册
+"""
+
+from datetime import date
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from src.ai_auto_wxgzh.tools.page_extractor import normalize_date
+from src.ai_auto_wxgzh.tools.topic_history import hamming_distance, simhash
+
+
+# 跟踪参数：完整名称或前缀
+_TRACKING_PARAMS = {
+    "spm",
+    "from",
+    "fr",
+    "ref",
+    "refer",
+    "share_token",
+    "share_from",
+    "share_source",
+    "scene",
+    "wfr",
+    "tt_from",
+    "fbclid",
+    "gclid",
+    "yclid",
+}
+_TRACKING_PREFIXES = ("utm_", "spm_", "share_")
+_MOBILE_PREFIXES = ("m.", "wap.", "3g.")
+_HOST_PREFIXES = ("www.",) + _MOBILE_PREFIXES
+
+# 域名 -> 权威度（0~1），匹配域名本身和子域名
+_authorities = {}
+DEFAULT_AUTHORITY = 0.5
+
+
+def register_authority(domain, weight):
+    """注册来源域名的权威度（0~1）"""
+    _authorities[domain] = weight
+
+
+# 政府、官方媒体
+register_authority("gov.cn", 1.0)
+register_authority("news.cn", 0.95)
+register_authority("xinhuanet.com", 0.95)
+register_authority("people.com.cn", 0.95)
+register_authority("cctv.com", 0.9)
+register_authority("chinanews.com.cn", 0.85)
+register_authority("chinadaily.com.cn", 0.85)
+register_authority("edu.cn", 0.85)
+# 主流媒体和门户
+register_authority("thepaper.cn", 0.8)
+register_authority("caixin.com", 0.8)
+register_authority("yicai.com", 0.75)
+register_authority("163.com", 0.7)
+register_authority("sina.com.cn", 0.7)
+register_authority("sohu.com", 0.65)
+register_authority("qq.com", 0.65)
+register_authority("ifeng.com", 0.65)
+# 自媒体和社区
+register_authority("baijiahao.baidu.com", 0.4)
+register_authority("toutiao.com", 0.4)
+register_authority("zhihu.com", 0.4)
+register_authority("weixin.qq.com", 0.4)
+register_authority("csdn.net", 0.35)
+
+
+def _host(url):
+    try:
+        return (urlsplit(url or "").hostname or "").lower()
+    except ValueError:
+        return ""
+
+
+def _normalize_host(host):
+    host = (host or "").lower().rstrip(".")
+    for prefix in _HOST_PREFIXES:
+        if host.startswith(prefix) and host.count(".") > 1:
+            return host[len(prefix) :]
+    return host
+
+
+def _is_tracking_param(name):
+    name = name.lower()
+    return name in _TRACKING_PARAMS or name.startswith(_TRACKING_PREFIXES)
+
+
+def canonicalize_url(url):
+    """标准化 URL，作为去重的键（不用于访问），无法解析时原样返回"""
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except (AttributeError, ValueError):
+        return url
+    host = _normalize_host(parts.hostname)
+    if port and (parts.scheme, port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{port}"
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, True) if not _is_tracking_param(k))
+    path = parts.path.rstrip("/") or "/"
+    # http/https 视为同一地址
+    return urlunsplit(("https", host, path, urlencode(query), ""))
+
+
+def authority(url):
+    """返回 URL 来源的权威度，未注册的域名为 DEFAULT_AUTHORITY"""
+    host = _normalize_host(_host(url))
+    best = None
+    for domain in _authorities:
+        # 匹配最长的域名，如 baijiahao.baidu.com 优先于 baidu.com
+        if (host == domain or host.endswith("." + domain)) and (
+            best is None or len(domain) > len(best)
+        ):
+            best = domain
+    return _authorities[best] if best else DEFAULT_AUTHORITY
+
+
+def freshness(pub_time, half_life_days=7, unknown=0.3, today=None):
+    """发布时间的时效性得分：当天为 1，每 half_life_days 天减半，无法识别的日期为 unknown"""
+    pub_date = normalize_date(pub_time)
+    if not pub_date:
+        return unknown
+    today = today or date.today()
+    age = (today - date.fromisoformat(pub_date)).days
+    return 0.5 ** (max(age, 0) / half_life_days)
+
+
+def _fingerprint(result):
+    text = f"{result.get('title') or ''} {(result.get('abstract') or '')[:200]}".strip()
+    return simhash(text) if text else None
+
+
+def _url_rank(url):
+    return authority(url), not _host(url).startswith(_MOBILE_PREFIXES)
+
+
+def _absorb(kept, other):
+    """把重复结果中的信息合并到保留的结果中"""
+    if len(other.get("abstract") or "") > len(kept.get("abstract") or ""):
+        kept["abstract"] = other["abstract"]
+    for field in ("title", "pub_time"):
+        if not kept.get(field) and other.get(field):
+            kept[field] = other[field]
+    # 保留来源更权威的地址，权威度相同时优先桌面版
+    if other.get("url") and _url_rank(other["url"]) > _url_rank(kept.get("url") or ""):
+        kept["url"] = other["url"]
+
+
+def merge_results(result_lists, max_results=None, max_distance=3, freshness_half_life=7):
+    """
+    合并多个模块的结果列表（靠前的列表优先），去重后按得分从高到低返回至多 max_results 条
+    得分 = 0.6 * 时效性 + 0.4 * 来源权威度
+    """
+    kept = []  # [(结果, SimHash)]
+    by_url = {}
+    for results in result_lists:
+        for result in results or []:
+            if not isinstance(result, dict):
+                continue
+            result = dict(result)
+            url = result.get("url")
+            key = canonicalize_url(url) if url else None
+            if key and key in by_url:
+                _absorb(by_url[key], result)
+                continue
+
+            fingerprint = _fingerprint(result)
+            duplicate = None
+            if fingerprint is not None:
+                for other, other_fingerprint in kept:
+                    if (
+                        other_fingerprint is not None
+                        and hamming_distance(fingerprint, other_fingerprint) <= max_distance
+                    ):
+                        duplicate = other
+                        break
+            if duplicate is not None:
+                _absorb(duplicate, result)
+                if key:
+                    by_url[key] = duplicate
+                continue
+
+            kept.append((result, fingerprint))
+            if key:
+                by_url[key] = result
+
+    def score(result):
+        fresh = freshness(result.get("pub_time"), freshness_half_life)
+        return 0.6 * fresh + 0.4 * authority(result.get("url") or "")
+
+    # 排序稳定，得分相同时靠前模块的结果在前
+    merged = sorted((result for result, _ in kept), key=score, reverse=True)
+    return merged[:max_results] if max_results else merged
@@ -0,0 +1,100 @@
+import os
+import time
+import hashlib
+import threading
+import importlib.util
+
+
+class ModuleRegistry:
+    """
+    已加载的搜索模块缓存：
+    - 按 模块ID + 文件修改时间/大小 缓存执行后的模块对象，命中时只需一次 stat
+    - 修改时间变化时再比较文件哈希，内容未变则继续使用，变化则重新加载
+    - 模块重新生成时调用 invalidate 清除
+    - 记录每个模块的加载次数、耗时和命中次数
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._modules = {}  # module_id -> (stat_key, sha1, module)
+        self._load_locks = {}
+        self._stats = {}
+
+    @staticmethod
+    def _stat_key(path):
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+
+    @staticmethod
+    def _file_hash(path):
+        with open(path, "rb") as f:
+            return hashlib.sha1(f.read()).hexdigest()
+
+    def _stat(self, module_id):
+        return self._stats.setdefault(
+            module_id, {"loads": 0, "hits": 0, "load_time": 0.0, "last_load_time": 0.0}
+        )
+
+    def get(self, module_id, path):
+        """获取模块对象，文件未变化时直接返回缓存；加载失败抛出异常"""
+        stat_key = self._stat_key(path)
+        with self._lock:
+            cached = self._modules.get(module_id)
+            if cached and cached[0] == stat_key:
+                self._stat(module_id)["hits"] += 1
+                return cached[2]
+            load_lock = self._load_locks.setdefault(module_id, threading.Lock())
+
+        # 同一模块只加载一次，其他线程等待加载结果
+        with load_lock:
+            with self._lock:
+                cached = self._modules.get(module_id)
+            if cached and cached[0] == stat_key:
+                return cached[2]
+
+            sha1 = self._file_hash(path)
+            if cached and cached[1] == sha1:
+                # 只是修改时间变化（如被复制/touch），内容相同
+                with self._lock:
+                    self._modules[module_id] = (stat_key, sha1, cached[2])
+                return cached[2]
+
+            start = time.perf_counter()
+            spec = importlib.util.spec_from_file_location(f"search_module_{module_id}", path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            elapsed = time.perf_counter() - start
+
+            with self._lock:
+                self._modules[module_id] = (stat_key, sha1, module)
+                stats = self._stat(module_id)
+                stats["loads"] += 1
+                stats["load_time"] += elapsed
+                stats["last_load_time"] = elapsed
+            return module
+
+    def invalidate(self, module_id=None):
+        """清除指定模块（不指定则清除全部）的缓存"""
+        with self._lock:
+            if module_id is None:
+                self._modules.clear()
+            else:
+                self._modules.pop(module_id, None)
+
+    def get_stats(self):
+        """返回 {module_id: {loads, hits, load_time, last_load_time}}"""
+        with self._lock:
+            return {module_id: dict(stats) for module_id, stats in self._stats.items()}
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_module_registry():
+    """获取进程内共享的模块缓存"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModuleRegistry()
+        return _registry
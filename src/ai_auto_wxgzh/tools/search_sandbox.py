@@ -0,0 +1,198 @@
+import time
+import queue
+import atexit
+import threading
+import importlib
+import multiprocessing
+
+from src.ai_auto_wxgzh.tools.search_modules import ModuleRegistry
+
+try:
+    import resource  # 仅 POSIX 可用
+except ImportError:
+    resource = None
+
+
+# 生成的搜索代码常用的库，子进程启动时预先导入
+WARM_MODULES = ("json", "re", "urllib.parse", "requests", "bs4")
+
+
+def _worker_main(conn, memory_limit_mb):
+    """
+    子进程入口：循环接收 (模块ID, 路径, 话题, 条数, 需要清除缓存的模块ID)，
+    先清除主进程通知的模块缓存，再执行 search_web 并返回结果
+    """
+    if resource is not None and memory_limit_mb:
+        limit = memory_limit_mb * 1024 * 1024
+        try:
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ValueError, OSError):
+            pass
+
+    for name in WARM_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+
+    registry = ModuleRegistry()
+    while True:
+        try:
+            module_id, module_path, topic, max_results, invalidated = conn.recv()
+        except (EOFError, OSError):
+            break
+        for invalid_id in invalidated:
+            registry.invalidate(invalid_id)
+        try:
+            module = registry.get(module_id, module_path)
+            conn.send(("ok", module.search_web(topic, max_results)))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+
+class _Worker:
+    def __init__(self, ctx, memory_limit_mb):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main, args=(child_conn, memory_limit_mb), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+        self.synced = 0  # 已通知该子进程的模块缓存清除记录数
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=1)
+        self.conn.close()
+
+
+class SandboxPool:
+    """
+    在子进程中执行 LLM 生成的 search_web 代码：
+    - 预先启动 size 个子进程（spawn 方式，Windows 与 POSIX 一致），子进程预先导入常用库
+    - 每次执行有硬超时，超时或子进程崩溃时直接杀掉并补充新进程，不影响主程序
+    - POSIX 下通过 RLIMIT_AS 限制子进程内存（Windows 不支持，只依赖超时）
+    - 子进程执行 max_tasks 次后替换，避免生成代码的内存泄漏累积
+    - 每个子进程用 ModuleRegistry 缓存已加载的模块，invalidate 的模块在下次执行前清除
+    """
+
+    def __init__(self, size=4, memory_limit_mb=1024, max_tasks=100):
+        self.memory_limit_mb = memory_limit_mb
+        self.max_tasks = max_tasks
+        self._ctx = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._idle = queue.Queue()
+        self._busy = set()
+        self._closed = False
+        self._invalidations = []  # 需要清除缓存的模块ID（None 表示全部），按时间顺序
+        for _ in range(size):
+            self._idle.put(self._spawn())
+
+    def _spawn(self):
+        worker = _Worker(self._ctx, self.memory_limit_mb)
+        with self._lock:
+            worker.synced = len(self._invalidations)  # 新进程没有旧的缓存
+        return worker
+
+    def _acquire(self, timeout):
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError("没有空闲的搜索进程")
+        with self._lock:
+            self._busy.add(worker)
+        return worker
+
+    def _release(self, worker, healthy=True):
+        with self._lock:
+            self._busy.discard(worker)
+            if self._closed:
+                worker.kill()
+                return
+        if not healthy or worker.tasks >= self.max_tasks or not worker.process.is_alive():
+            worker.kill()
+            worker = self._spawn()
+        self._idle.put(worker)
+
+    def run(self, module_id, module_path, topic, max_results, timeout=60):
+        """在子进程中执行搜索模块，超时抛出 TimeoutError，执行出错抛出 RuntimeError"""
+        deadline = time.monotonic() + timeout
+        worker = self._acquire(timeout)
+        with self._lock:
+            invalidated = self._invalidations[worker.synced :]
+            worker.synced = len(self._invalidations)
+        status = None
+        try:
+            worker.conn.send((module_id, str(module_path), topic, max_results, invalidated))
+            if worker.conn.poll(max(deadline - time.monotonic(), 0)):
+                status, payload = worker.conn.recv()
+        except (EOFError, OSError) as e:
+            raise RuntimeError(f"搜索进程异常退出: {e}")
+        finally:
+            # 没有正常收到结果（超时、子进程崩溃或其他任何异常）时替换子进程
+            if status is not None:
+                worker.tasks += 1
+            self._release(worker, healthy=status is not None)
+
+        if status is None:
+            raise TimeoutError(f"搜索模块 {module_id} 执行超时，已终止")
+        if status == "error":
+            raise RuntimeError(payload)
+        return payload
+
+    def invalidate(self, module_id=None):
+        """清除各子进程中指定模块（不指定则全部）的缓存，在子进程下一次执行搜索前生效"""
+        with self._lock:
+            self._invalidations.append(module_id)
+
+    def kill_busy(self):
+        """终止所有正在执行的搜索（如用户停止任务），对应的 run 调用抛出 RuntimeError"""
+        with self._lock:
+            busy = list(self._busy)
+        for worker in busy:
+            if worker.process.is_alive():
+                worker.process.kill()
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            busy = list(self._busy)
+        for worker in busy:
+            worker.kill()
+        while True:
+            try:
+                self._idle.get_nowait().kill()
+            except queue.Empty:
+                break
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_sandbox_pool():
+    """获取进程内共享的搜索进程池（首次调用时启动子进程）"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SandboxPool()
+            atexit.register(_pool.shutdown)
+        return _pool
+
+
+def invalidate_module(module_id=None):
+    """清除子进程中已加载的模块缓存，进程池未启动时什么也不做"""
+    with _pool_lock:
+        pool = _pool
+    if pool is not None:
+        pool.invalidate(module_id)
+
+
+def kill_running_searches():
+    """终止正在执行的搜索，进程池未启动时什么也不做"""
+    with _pool_lock:
+        pool = _pool
+    if pool is not None:
+        pool.kill_busy()
@@ -1,22 +1,86 @@
-import json
 import time
-import requests
 import re
-from bs4 import BeautifulSoup
-import importlib.util
 from pathlib import Path
-from aipyapp.aipy import TaskManager
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import threading
 from rich.console import Console
 
 from src.ai_auto_wxgzh.config.config import Config
 from src.ai_auto_wxgzh.utils import log
+from src.ai_auto_wxgzh.tools.search_cache import SearchCache, normalize_topic, jaccard_similarity
+from src.ai_auto_wxgzh.tools.topic_history import simhash
+from src.ai_auto_wxgzh.tools.search_errors import ErrorJournal
+from src.ai_auto_wxgzh.tools.search_stats import ModuleStats
+from src.ai_auto_wxgzh.tools.module_selector import ModuleSelector
+from src.ai_auto_wxgzh.tools.search_modules import get_module_registry
+from src.ai_auto_wxgzh.tools.search_sandbox import get_sandbox_pool, invalidate_module
+from src.ai_auto_wxgzh.tools.aipy_workers import get_aipy_pool
+from src.ai_auto_wxgzh.tools.page_fetcher import get_page_fetcher
+from src.ai_auto_wxgzh.tools.search_merge import merge_results
+from src.ai_auto_wxgzh.tools import page_extractor
+
+
+# 搜索模块类型（按优先级）：没有可用模块时只同步生成第一个，其余在后台生成
+MODULE_TYPES = [
+    ("combined", "结合多种搜索引擎的综合搜索，按优先级顺序尝试各种搜索方法"),
+    ("baidu", "使用百度搜索引擎，添加时间筛选参数"),
+    ("bing", "使用Bing搜索引擎，添加时间筛选参数"),
+    ("scraper", "直接访问相关领域的权威网站并抓取最新内容"),
+    ("duckduckgo", "使用DuckDuckGo搜索引擎，添加时间筛选参数"),
+    ("google", "使用Google搜索引擎，仅在其他方法无法获取足够信息时使用"),
+]
+
+# AIPy 回复中的代码块：````python main ... ````
+_AIPY_CODE_BLOCK = re.compile(r"^(`{4})(\w+)\s+([\w\-\.]+)\n(.*?)^\1\s*$", re.DOTALL | re.MULTILINE)
+
+_search_executor = None
+_search_executor_lock = threading.Lock()
+
+_warmup_executor = None
+_warmup_lock = threading.Lock()
+_generating = {}  # 模块类型 -> Future，同一类型同时只生成一次
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def _get_search_executor():
+    """进程内共享的搜索线程池，被忽略的慢模块在后台执行完毕后释放线程"""
+    global _search_executor
+    with _search_executor_lock:
+        if _search_executor is None:
+            _search_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="search")
+        return _search_executor
+
+
+def _parse_code_blocks(markdown):
+    """按 AIPy 的格式解析回复中的代码块，返回 {块名称: 代码}"""
+    code_blocks = {}
+    for match in _AIPY_CODE_BLOCK.finditer(markdown):
+        _, _, name, content = match.groups()
+        code_blocks[name] = content.rstrip("\n")
+    return code_blocks
+
+
+def _get_warmup_executor():
+    """进程内共享的模块生成线程池，限制同时生成的模块数"""
+    global _warmup_executor
+    with _warmup_lock:
+        if _warmup_executor is None:
+            _warmup_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="module-gen")
+        return _warmup_executor
 
 
 class SearchService:
-    """搜索服务，支持持久化、多种搜索方法和纠错机制"""
+    """
+    搜索服务，支持持久化、多种搜索方法和纠错机制
+    通过 get_search_service 获取进程内共享的实例，search 可在多个线程中同时调用
+    """
 
     def __init__(self):
         self.console = Console()
+        self.config_generation = Config.get_instance().get_aipy_generation()
         # 从配置中获取工作目录
         work_dir = Path(Config.get_instance().get_aipy_settings().get("workdir", "aipy_work"))
 
@@ -33,110 +97,54 @@ class SearchService:
         self.search_modules_dir = self.cache_dir / "search_modules"
         self.search_modules_dir.mkdir(exist_ok=True)
         self.modules_info_file = self.cache_dir / "modules_info.json"
-        self.cache_file = self.cache_dir / "search_cache.json"
-        self.error_log_file = self.cache_dir / "search_errors.json"
+        self.cache_file = self.cache_dir / "search_cache.db"
+        self.error_log_file = self.cache_dir / "search_errors.jsonl"
 
         # 加载数据
         self.default_cache_duration = 3600 * 24  # 超过1天的搜索结果缓存清除
-        self.modules_info = self._load_modules_info()
-        self.cache = self._load_cache()
-        self._clean_cache()  # 加载后立即清理
-        self.error_log = self._load_error_log()
-
-        self.task_manager = None
-
-        # 确保搜索模块存在
-        self._ensure_search_modules()
-
-    def _load_cache(self):
-        """加载缓存数据并确保时间戳是浮点数"""
-        if self.cache_file.exists():
-            try:
-                with open(self.cache_file, "r", encoding="utf-8") as f:
-                    cache_data = json.load(f)
-
-                # 确保所有时间戳都是浮点数
-                for key, data in cache_data.items():
-                    if "timestamp" in data and isinstance(data["timestamp"], str):
-                        try:
-                            data["timestamp"] = float(data["timestamp"])
-                        except ValueError:
-                            data["timestamp"] = 0
-
-                return cache_data
-            except Exception as e:
-                self.console.print(f"[yellow]警告: 无法加载缓存文件: {e}[/yellow]")
-        return {}
-
-    def _save_cache(self):
-        """保存缓存数据"""
-        try:
-            with open(self.cache_file, "w", encoding="utf-8") as f:
-                json.dump(self.cache, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            self.console.print(f"[yellow]警告: 无法保存缓存文件: {e}[/yellow]")
-
-    def _clean_cache(self):
-        """清理过期的缓存条目"""
-        current_time = time.time()
-        cleaned_cache = {}
-
-        # 只保留未过期的条目
-        for key, data in self.cache.items():
-            timestamp = data.get("timestamp", 0)
-            # 确保timestamp是浮点数
-            if isinstance(timestamp, str):
-                try:
-                    timestamp = float(timestamp)
-                except ValueError:
-                    timestamp = 0
-
-            if current_time - timestamp < self.default_cache_duration:
-                cleaned_cache[key] = data
-
-        # 如果有条目被清理，更新缓存并保存
-        if len(cleaned_cache) < len(self.cache):
-            self.console.print(
-                f"[yellow]已清理 {len(self.cache) - len(cleaned_cache)} 个过期缓存条目[/yellow]"
-            )
-            self.cache = cleaned_cache
-            self._save_cache()
+        self.partial_cache_duration = 600  # 到达截止时间的部分结果只缓存10分钟
+        self.module_stats = ModuleStats.get_instance(self.modules_info_file)
+        self.modules_info = self.module_stats.data  # 与同进程的其他实例共享
+        self.cache = SearchCache(
+            self.cache_file,
+            default_ttl=self.default_cache_duration,
+            legacy_json_file=self.cache_dir / "search_cache.json",  # 旧版缓存自动导入
+        )
+        self.similar_threshold = 0.8  # 相似话题复用缓存结果的最低 Jaccard 相似度
+        self.error_journal = ErrorJournal.get_instance(self.error_log_file)
+        self.error_window = 3600  # 选择模块时参考最近1小时的错误次数
+
+        # 按搜索收益（成功、结果数、耗时，随时间衰减）采样选择模块，收益上界低于阈值时重新生成
+        self.selector = ModuleSelector(self.module_stats)
+        self.regenerate_min_trials = 5
+        self.regenerate_threshold = 0.3
+
+        self.module_registry = get_module_registry()
+        self.page_fetcher = get_page_fetcher()
+
+        # 网页摘要缓存：新鲜期内不再请求，之后用 ETag/Last-Modified 条件请求验证
+        self.page_fresh_duration = 3600 * 6
+        self.page_cache = SearchCache(
+            self.cache_dir / "page_cache.db", max_entries=20000, default_ttl=3600 * 24 * 30
+        )
 
-    def _load_modules_info(self):
-        """加载模块信息"""
-        if self.modules_info_file.exists():
-            try:
-                with open(self.modules_info_file, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except Exception as e:
-                self.console.print(f"[yellow]警告: 无法加载模块信息文件: {e}[/yellow]")
-        return {"modules": {}, "default_module": None, "success_rate": {}, "last_updated": {}}
+        # 并发搜索：按得分排列不同类型的模块依次降级，最多同时运行 race_count 个，
+        # 结果数达到 min_results 即返回
+        self.race_count = 3
+        self.min_results = 3
+        self.default_hedge_delay = 5.0  # 首选模块还没有耗时记录时，启动备用模块前的等待时间
 
-    def _save_modules_info(self):
-        """保存模块信息"""
-        try:
-            with open(self.modules_info_file, "w", encoding="utf-8") as f:
-                json.dump(self.modules_info, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            self.console.print(f"[yellow]警告: 无法保存模块信息文件: {e}[/yellow]")
+        # 生成的搜索代码在子进程中执行（配置 search_sandbox，子进程在第一次搜索时启动），
+        # 单个模块超过 module_timeout 秒强制终止；关闭时在当前进程执行，没有超时保护
+        self.use_sandbox = Config.get_instance().search_sandbox
+        self.module_timeout = 60
 
-    def _load_error_log(self):
-        """加载错误日志"""
-        if self.error_log_file.exists():
-            try:
-                with open(self.error_log_file, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except Exception as e:
-                self.console.print(f"[yellow]警告: 无法加载错误日志文件: {e}[/yellow]")
-        return {"errors": []}
+        # 某类模块连续生成失败 warmup_max_failures 次后，间隔 warmup_retry_interval 秒再重试
+        self.warmup_max_failures = 3
+        self.warmup_retry_interval = 3600 * 24
 
-    def _save_error_log(self):
-        """保存错误日志"""
-        try:
-            with open(self.error_log_file, "w", encoding="utf-8") as f:
-                json.dump(self.error_log, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            self.console.print(f"[yellow]警告: 无法保存错误日志文件: {e}[/yellow]")
+        # 在后台生成缺少的搜索模块
+        self._ensure_search_modules()
 
     def _log_error(self, module_name, error_type, error_message, topic=None):
         """记录错误"""
@@ -147,73 +155,98 @@ class SearchService:
             "error_message": str(error_message),
             "topic": topic,
         }
-        self.error_log["errors"].append(error_entry)
-        self._save_error_log()
+        try:
+            self.error_journal.append(error_entry)
+        except Exception as e:
+            self.console.print(f"[yellow]警告: 无法写入错误日志文件: {e}[/yellow]")
 
         # 更新模块成功率
-        if module_name in self.modules_info["success_rate"]:
-            self.modules_info["success_rate"][module_name]["failures"] += 1
-            self._save_modules_info()
-
-    def _init_task_manager(self):
-        """初始化TaskManager"""
-        if not self.task_manager:
-            try:
-                self.task_manager = TaskManager(
-                    Config.get_instance().get_aipy_settings(), console=self.console
+        self.module_stats.record(module_name, success=False, reward=0.0)
+
+    def _pending_module_types(self):
+        """还没有生成的模块类型（按优先级），跳过连续失败次数过多、还未到重试时间的类型"""
+        existing = {info["type"] for info in self.module_stats.modules().values()}
+        pending = []
+        for module_type, description in MODULE_TYPES:
+            if module_type in existing:
+                continue
+            progress = self.modules_info["warmup"].get(module_type, {})
+            if (
+                progress.get("failures", 0) >= self.warmup_max_failures
+                and time.time() - progress.get("updated_at", 0) < self.warmup_retry_interval
+            ):
+                continue
+            pending.append((module_type, description))
+        return pending
+
+    def _claim_generation(self, module_type):
+        """返回 (Future, 是否由调用方负责生成)，同一类型正在生成时返回已有的 Future"""
+        with _warmup_lock:
+            if module_type in _generating:
+                return _generating[module_type], False
+            future = _generating[module_type] = Future()
+            return future, True
+
+    def _run_generation(self, future, module_type, description):
+        """生成模块并记录进度（写入 modules_info.json，中断后下次启动从未完成的类型继续）"""
+        failures = self.modules_info["warmup"].get(module_type, {}).get("failures", 0)
+        self.module_stats.update_warmup(module_type, status="running")
+        module_id = None
+        try:
+            module_id = self._generate_search_module(module_type, description)
+        except Exception as e:
+            self.console.print(f"[red]生成搜索模块 {module_type} 失败: {e}[/red]")
+        finally:
+            if module_id:
+                self.module_stats.update_warmup(
+                    module_type, status="done", module_id=module_id, failures=0
                 )
-                # 验证TaskManager是否正常工作
-                if not self.task_manager.llm:
-                    self.console.print("[red]警告: TaskManager的LLM未正确初始化[/red]")
-            except Exception as e:
-                self.console.print(f"[red]TaskManager初始化失败: {e}[/red]")
-                raise
+            else:
+                self.module_stats.update_warmup(module_type, status="failed", failures=failures + 1)
+            with _warmup_lock:
+                _generating.pop(module_type, None)
+            future.set_result(module_id)
+
+    def _start_generation(self, module_type, description):
+        """在后台生成模块，返回 Future（结果为模块ID，失败为 None），同一类型只生成一次"""
+        future, owner = self._claim_generation(module_type)
+        if owner:
+            _get_warmup_executor().submit(self._run_generation, future, module_type, description)
+        return future
+
+    def _wait_generation(self, future, deadline_at=None):
+        """等待模块生成完成并返回模块ID，超过截止时间抛出 TimeoutError（生成在后台继续）"""
+        timeout = None if deadline_at is None else max(deadline_at - time.monotonic(), 0)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            raise TimeoutError("搜索超时")
 
     def _ensure_search_modules(self):
-        """确保搜索模块文件存在，如果不存在则创建"""
-        # 检查是否有任何搜索模块
-        if not self.modules_info["modules"]:
-            self._init_task_manager()
-
-            # 生成多种搜索模块
-            module_types = [
-                ("baidu", "使用百度搜索引擎，添加时间筛选参数"),
-                ("bing", "使用Bing搜索引擎，添加时间筛选参数"),
-                ("scraper", "直接访问相关领域的权威网站并抓取最新内容"),
-                ("duckduckgo", "使用DuckDuckGo搜索引擎，添加时间筛选参数"),
-                ("google", "使用Google搜索引擎，仅在其他方法无法获取足够信息时使用"),
-                ("combined", "结合多种搜索引擎的综合搜索，按优先级顺序尝试各种搜索方法"),
-            ]
-
-            for module_type, description in module_types:
-                self._generate_search_module(module_type, description)
-
-            # 设置默认模块
-            if "combined" in self.modules_info["modules"]:
-                self.modules_info["default_module"] = "combined"
-            elif self.modules_info["modules"]:
-                # 使用第一个可用模块作为默认
-                self.modules_info["default_module"] = list(self.modules_info["modules"].keys())[0]
-
-            self._save_modules_info()
+        """在后台并发生成缺少的搜索模块，已生成的类型（包括上次中断前完成的）不再生成"""
+        for module_type, description in self._pending_module_types():
+            self._start_generation(module_type, description)
+
+    def _generate_needed_module(self, deadline_at=None):
+        """
+        没有可用模块时，优先生成优先级最高的模块并等待其完成，
+        返回模块ID（失败为 None），超过截止时间抛出 TimeoutError
+        """
+        module_type, description = (self._pending_module_types() or MODULE_TYPES)[0]
+        future = self._start_generation(module_type, description)
+        self._ensure_search_modules()  # 其余类型在后台生成
+        return self._wait_generation(future, deadline_at)
 
     def _generate_via_direct_llm(self, search_instruction, module_type, description):
         """方法1: 直接使用LLM生成代码，不依赖Task系统"""
-        self._init_task_manager()
-
-        # 直接调用LLM
-        response = self.task_manager.llm(search_instruction)
+        # 直接调用LLM（在AIPy子进程中执行）
+        response = get_aipy_pool().ask_llm(search_instruction)
 
         if not response or not isinstance(response, str):
             return None
 
-        # 使用AIPy的正则表达式模式进行匹配
-        pattern = re.compile(r"^(`{4})(\w+)\s+([\w\-\.]+)\n(.*?)^\1\s*$", re.DOTALL | re.MULTILINE)
-
-        code_blocks = {}
-        for match in pattern.finditer(response):
-            _, _, name, content = match.groups()
-            code_blocks[name] = content.rstrip("\n")
+        # 使用AIPy的代码块格式进行匹配
+        code_blocks = _parse_code_blocks(response)
 
         # 优先查找main块
         if "main" in code_blocks and "search_web" in code_blocks["main"]:
@@ -249,17 +282,11 @@ class SearchService:
         return None
 
     def _generate_via_task_system(self, search_instruction, module_type, description):
-        """方法2: 使用Task系统生成代码"""
-        self._init_task_manager()
-
-        task = self.task_manager.new_task(search_instruction)
-        task.run()
+        """方法2: 使用Task系统生成代码（在AIPy子进程中执行）"""
+        snapshot = get_aipy_pool().run_task(search_instruction)
 
         # 多种方式提取代码
-        code = self._extract_code_from_task(task)
-
-        task.done()
-        return code
+        return self._extract_code_from_task(snapshot)
 
     def _generate_via_template(self, search_instruction, module_type, description):
         """方法3: 基于模板生成代码"""
@@ -301,18 +328,18 @@ class SearchService:
             """
         return template_code
 
-    def _extract_code_from_task(self, task):
+    def _extract_code_from_task(self, snapshot):
         # 首先检查runner历史，这里包含实际执行的代码
-        if hasattr(task, "runner") and task.runner.history:
-            for entry in task.runner.history:
+        if snapshot.get("runner"):
+            for entry in snapshot["runner"]:
                 if isinstance(entry, dict) and "code" in entry:
                     code = entry["code"]
                     if code and "def search_web" in str(code):
                         return code
 
         # 然后检查LLM历史
-        if hasattr(task, "llm") and hasattr(task.llm, "history"):
-            messages = task.llm.history.get_messages()
+        if snapshot.get("messages"):
+            messages = snapshot["messages"]
             for message in reversed(messages):
                 # 直接访问字典的键，而不是使用hasattr和.属性访问
                 msg_role = message.get("role")
@@ -321,8 +348,8 @@ class SearchService:
                 if msg_role == "assistant":
                     # 修正：确保content不为None，并且包含"def search_web"
                     if content is not None and "def search_web" in content:
-                        # 使用AIPy的parse_reply方法
-                        blocks = task.parse_reply(content)
+                        # 使用AIPy的代码块格式解析
+                        blocks = _parse_code_blocks(content)
                         if "main" in blocks:
                             return blocks["main"]
                         # 如果没有main块，尝试其他块
@@ -382,20 +409,20 @@ class SearchService:
             # 保存代码到模块文件
             with open(module_path, "w", encoding="utf-8") as f:
                 f.write(code)
+            self.module_registry.invalidate(module_id)
+            invalidate_module(module_id)  # 沙箱子进程中的缓存
 
-            # 更新模块信息
-            self.modules_info["modules"][module_id] = {
+            # 更新模块信息并初始化成功率统计，综合搜索模块作为默认模块
+            info = {
                 "type": module_type,
                 "description": description,
                 "path": str(module_path),
                 "created_at": time.time(),
             }
-
-            # 初始化成功率统计
-            self.modules_info["success_rate"][module_id] = {"successes": 0, "failures": 0}
-
-            self.modules_info["last_updated"][module_type] = time.time()
-            self._save_modules_info()
+            if not self.module_stats.add_module(
+                module_id, info, make_default=module_type == "combined"
+            ):
+                self.console.print("[yellow]警告: 无法保存模块信息文件[/yellow]")
 
             self.console.print(f"[green]搜索模块 {module_type} 已成功生成并保存[/green]")
             return module_id
@@ -495,50 +522,169 @@ class SearchService:
         self.console.print(f"[red]所有方法都无法生成搜索模块 {module_type} 的代码[/red]")
         return None
 
-    def _get_best_module(self):
-        """根据历史成功率选择最佳模块"""
-        if not self.modules_info["modules"]:
-            return None
-
-        # 计算每个模块的成功率
-        success_rates = {}
-        for module_id, stats in self.modules_info["success_rate"].items():
-            if module_id in self.modules_info["modules"]:  # 确保模块仍然存在
-                total = stats["successes"] + stats["failures"]
-                if total > 0:
-                    success_rates[module_id] = stats["successes"] / total
-                else:
-                    success_rates[module_id] = 0.5  # 默认值
+    def _rank_modules(self, count):
+        """
+        选出搜索降级链：对每个模块的收益分布采样，按采样值（最近频繁出错的折算）排列，
+        每种类型只取一个
+        """
+        recent_errors = self.error_journal.error_counts(self.error_window)
+        modules = self.module_stats.modules()
+        scores = {
+            module_id: self.selector.sample(module_id) / (1 + recent_errors.get(module_id, 0))
+            for module_id in modules
+        }
 
-        # 如果没有足够的数据，使用默认模块
-        if not success_rates or max(success_rates.values()) < 0.1:
-            return self.modules_info["default_module"]
+        candidates, types = [], set()
+        for module_id in sorted(scores, key=scores.get, reverse=True):
+            module_type = modules[module_id]["type"]
+            if module_type in types:
+                continue
+            types.add(module_type)
+            candidates.append(module_id)
+            if len(candidates) >= count:
+                break
+        return candidates
 
-        # 返回成功率最高的模块
-        return max(success_rates, key=success_rates.get)
+    def _get_best_module(self):
+        """按 Thompson 采样选择本次搜索的首选模块，没有模块时返回默认模块"""
+        candidates = self._rank_modules(1)
+        return candidates[0] if candidates else self.modules_info["default_module"]
 
     def _import_module(self, module_id):
-        """导入指定的搜索模块"""
+        """导入指定的搜索模块，失败时抛出 ImportError（由 _run_module 记录错误）"""
         if module_id not in self.modules_info["modules"]:
-            return None
+            raise ImportError(f"无法导入搜索模块 {module_id}: 模块不存在")
 
         module_path = self.modules_info["modules"][module_id]["path"]
         try:
-            spec = importlib.util.spec_from_file_location(f"search_module_{module_id}", module_path)
-            module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(module)
-            return module
+            return self.module_registry.get(module_id, module_path)
         except Exception as e:
-            self._log_error(module_id, "import_error", str(e))
-            return None
+            raise ImportError(f"无法导入搜索模块 {module_id}: {e}") from e
+
+    def _call_search_web(self, module_id, topic, max_results, deadline_at=None):
+        """调用模块的 search_web：沙箱模式下在子进程中执行并受超时限制，否则在当前进程执行"""
+        if not self.use_sandbox:
+            search_module = self._import_module(module_id)
+            return search_module.search_web(topic, max_results)
+
+        timeout = self.module_timeout
+        if deadline_at is not None:
+            timeout = max(min(timeout, deadline_at - time.monotonic()), 0.1)
+        module_path = self.modules_info["modules"][module_id]["path"]
+        return get_sandbox_pool().run(module_id, module_path, topic, max_results, timeout)
 
-    def _regenerate_module_if_needed(self, module_type):
-        """如果模块出错率过高，重新生成模块"""
+    def _run_module(self, module_id, topic, max_results, deadline_at=None):
+        """执行单个搜索模块，记录耗时和成功/失败"""
+        start = time.perf_counter()
+        try:
+            result = self._call_search_web(module_id, topic, max_results, deadline_at)
+        except Exception as e:
+            error_type = "import_error" if isinstance(e, ImportError) else "exception"
+            self._log_error(module_id, error_type, str(e), topic)
+            return {"success": False, "error": str(e)}
+        finally:
+            latency = time.perf_counter() - start
+            self.module_stats.record_latency(module_id, latency)
+
+        if not isinstance(result, dict) or not result.get("success", False):
+            error = result.get("error", "未知错误") if isinstance(result, dict) else "返回格式错误"
+            self._log_error(module_id, "search_failed", error, topic)
+            return {"success": False, "error": error}
+
+        useful = sum(1 for r in result.get("results") or [] if isinstance(r, dict) and r.get("url"))
+        reward = self.selector.reward(True, latency, useful, max_results)
+        self.module_stats.record(module_id, success=True, reward=reward)
+        return result
+
+    def _race_modules(self, candidates, topic, max_results, min_results, deadline_at=None):
+        """
+        按顺序对冲执行候选模块（降级链），返回 (模块ID, 结果, 已返回的全部成功结果)：
+        - 每个模块的预算为其 p50 耗时（没有记录时为 default_hedge_delay），从启动时算起
+        - 先运行首选模块，最近启动的模块超过预算仍未返回时再启动下一个候选模块，
+          最多同时运行 race_count 个；正在运行的模块都失败后立即启动下一个
+        - 第一个结果数达到 min_results 的结果作为主结果，还在运行的模块的结果忽略
+        - 已有结果数不足的成功结果时不再启动新模块，还在运行的模块都超过预算后，
+          以结果最多的成功结果（部分结果）作为主结果
+        - 所有模块的等待时间都受 deadline_at（time.monotonic()）约束，到期时同样返回部分结果
+        - 已返回的全部成功结果（主结果在前）用于合并
+        """
+        executor = _get_search_executor()
+        waiting = list(candidates)
+        pending = {}  # Future -> 模块ID
+        budget_at = {}  # Future -> 预算到期时间
+        best = None
+        successes = []
+        last_error = "搜索失败"
+
+        def launch():
+            """启动下一个候选模块，返回其预算到期时间（也是下一次对冲的时间）"""
+            module_id = waiting.pop(0)
+            budget = self.module_stats.latency_p50(module_id, default=self.default_hedge_delay)
+            future = executor.submit(self._run_module, module_id, topic, max_results, deadline_at)
+            pending[future] = module_id
+            budget_at[future] = time.monotonic() + budget
+            return budget_at[future]
+
+        next_hedge_at = launch()
+        while pending:
+            now = time.monotonic()
+            if deadline_at is not None and now >= deadline_at:
+                last_error = "搜索超时"
+                break
+
+            wake_at = [deadline_at] if deadline_at is not None else []
+            if best is not None:
+                # 已有部分结果：等到还在运行的模块都超过预算为止
+                give_up_at = max(budget_at[f] for f in pending)
+                if now >= give_up_at:
+                    break
+                wake_at.append(give_up_at)
+            elif waiting and len(pending) < self.race_count:
+                if now >= next_hedge_at:
+                    self.console.print(f"[yellow]搜索较慢，启动备用搜索模块: {waiting[0]}[/yellow]")
+                    next_hedge_at = launch()
+                    continue
+                wake_at.append(next_hedge_at)
+
+            timeout = max(min(wake_at) - now, 0) if wake_at else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                module_id = pending.pop(future)
+                budget_at.pop(future)
+                result = future.result()
+                if not result.get("success", False):
+                    last_error = result.get("error") or last_error
+                    continue
+                count = len(result.get("results") or [])
+                if count >= min_results:
+                    for other in pending:
+                        other.cancel()  # 未开始的直接取消，已开始的忽略其结果
+                    return module_id, result, [result] + successes
+                successes.append(result)
+                if best is None or count > len(best[1].get("results") or []):
+                    best = (module_id, result)
+
+            if not pending and waiting and best is None:
+                self.console.print(f"[yellow]尝试使用备用搜索模块: {waiting[0]}[/yellow]")
+                next_hedge_at = launch()
+
+        for other in pending:
+            other.cancel()
+        if best and pending:
+            self.console.print("[yellow]其余搜索模块超时，返回部分结果[/yellow]")
+        if not best:
+            return None, {"success": False, "error": last_error}, []
+        successes.remove(best[1])
+        return best[0], best[1], [best[1]] + successes
+
+    def _regenerate_module_if_needed(self, module_type, deadline_at=None):
+        """如果模块的搜索收益过低，重新生成模块，超过截止时间抛出 TimeoutError"""
         # 查找该类型的最新模块
         latest_module_id = None
         latest_time = 0
 
-        for module_id, info in self.modules_info["modules"].items():
+        modules = self.module_stats.modules()
+        for module_id, info in modules.items():
             if info["type"] == module_type and info["created_at"] > latest_time:
                 latest_module_id = module_id
                 latest_time = info["created_at"]
@@ -546,34 +692,32 @@ class SearchService:
         if not latest_module_id:
             return None
 
-        # 检查成功率
-        stats = self.modules_info["success_rate"].get(
-            latest_module_id, {"successes": 0, "failures": 0}
-        )
-        total = stats["successes"] + stats["failures"]
-
-        # 如果失败次数过多，重新生成
-        if total >= 5 and stats["failures"] / total > 0.7:
-            self.console.print(f"[yellow]模块 {module_type} 失败率过高，正在重新生成...[/yellow]")
-            description = self.modules_info["modules"][latest_module_id]["description"]
-            return self._generate_search_module(module_type, description)
+        # 收益的置信上界仍然很低时（乐观估计也很差），重新生成
+        mean, std, trials = self.selector.posterior(latest_module_id)
+        if trials >= self.regenerate_min_trials and mean + 2 * std < self.regenerate_threshold:
+            self.console.print(f"[yellow]模块 {module_type} 搜索收益过低，正在重新生成...[/yellow]")
+            description = modules[latest_module_id]["description"]
+            # 多个线程同时发现时只重新生成一次，其余等待结果
+            future = self._start_generation(module_type, description)
+            return self._wait_generation(future, deadline_at)
 
         return latest_module_id
 
-    def _validate_and_fix_results(self, results):
-        """验证搜索结果并修复缺失的摘要和时间"""
+    def _validate_and_fix_results(self, results, deadline_at=None):
+        """验证搜索结果并修复缺失的摘要和时间，超过截止时间后不再修复"""
         fixed_results = []
 
         for result in results:
-            # 检查是否缺少摘要或发布时间
-            if not result.get("abstract") or not result.get("pub_time"):
+            # 检查是否缺少摘要或发布时间（超过截止时间后不再修复）
+            expired = deadline_at is not None and time.monotonic() >= deadline_at
+            if not expired and (not result.get("abstract") or not result.get("pub_time")):
                 url = result.get("url")
                 if url:
                     self.console.print(f"[yellow]修复结果: 提取 {url} 的摘要和时间[/yellow]")
 
                     # 提取摘要和时间
                     try:
-                        abstract, pub_time = self._extract_content_and_date(url)
+                        abstract, pub_time = self._extract_content_and_date(url, deadline_at)
 
                         # 更新结果
                         if not result.get("abstract") and abstract:
@@ -589,16 +733,16 @@ class SearchService:
 
         return fixed_results
 
-    def _validate_and_fix_results_parallel(self, results):
-        """并行验证和修复搜索结果"""
-        from concurrent.futures import ThreadPoolExecutor
+    def _validate_and_fix_results_parallel(self, results, deadline_at=None):
+        """并行验证和修复搜索结果，到截止时间（time.monotonic()）仍未修复的保留原结果"""
 
         def fix_result(result):
+            result = dict(result)  # 超时后线程仍可能在执行，不修改原结果
             if not result.get("abstract") or not result.get("pub_time"):
                 url = result.get("url")
                 if url:
                     try:
-                        abstract, pub_time = self._extract_content_and_date(url)
+                        abstract, pub_time = self._extract_content_and_date(url, deadline_at)
 
                         if not result.get("abstract") and abstract:
                             result["abstract"] = abstract
@@ -609,126 +753,77 @@ class SearchService:
                         pass
             return result
 
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            fixed_results = list(executor.map(fix_result, results))
-
-        return fixed_results
+        # 共享的抓取线程池和连接池，全局及单站点并发受限，按站点排队提交
+        return self.page_fetcher.map(
+            fix_result, results, deadline_at, url=lambda result: result.get("url")
+        )
 
-    def _extract_content_and_date(self, url):
-        """从URL提取内容摘要和发布日期"""
+    def _extract_content_and_date(self, url, deadline_at=None):
+        """从URL提取内容摘要和发布日期，结果按URL缓存，超过新鲜期后用条件请求验证"""
         try:
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/91.0.4472.124 Safari/537.36"
-            }
-            response = requests.get(url, headers=headers, timeout=10)
+            cached = self.page_cache.get(url)
+            if cached and time.time() - cached["checked_at"] < self.page_fresh_duration:
+                return cached["abstract"], cached["pub_time"]
+
+            headers = {}
+            if cached and cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached and cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+            # 只读取网页开头部分（head 和前几段正文）
+            response, html = self.page_fetcher.get_html_head(url, deadline_at, headers=headers)
+            if response.status_code == 304 and cached:
+                # 页面未变化，沿用之前提取的结果
+                cached["checked_at"] = time.time()
+                self.page_cache.put(url, cached)
+                return cached["abstract"], cached["pub_time"]
             response.raise_for_status()
 
-            # 使用正确的编码
-            if response.encoding.lower() == "iso-8859-1":
-                possible_encoding = requests.utils.get_encodings_from_content(response.text)
-                if possible_encoding:
-                    response.encoding = possible_encoding[0]
-                else:
-                    response.encoding = response.apparent_encoding
-
-            soup = BeautifulSoup(response.text, "html.parser")
-
-            # 提取发布日期 - 多种方法
-            pub_date = None
-
-            # 方法1: 检查meta标签
-            meta_date = (
-                soup.find("meta", property="article:published_time")
-                or soup.find("meta", itemprop="datePublished")
-                or soup.find("meta", attrs={"name": "pubdate"})
-                or soup.find("meta", attrs={"name": "publishdate"})
+            abstract, pub_date = page_extractor.extract(html, url)
+            self.page_cache.put(
+                url,
+                {
+                    "abstract": abstract,
+                    "pub_time": pub_date,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "checked_at": time.time(),
+                },
             )
-            if meta_date and meta_date.get("content"):
-                pub_date = meta_date.get("content")
-
-            # 方法2: 查找time标签
-            if not pub_date:
-                time_tag = soup.find("time")
-                if time_tag and time_tag.get("datetime"):
-                    pub_date = time_tag.get("datetime")
-
-            # 方法3: 正则表达式查找日期格式
-            if not pub_date:
-                date_patterns = [
-                    r"\d{4}-\d{2}-\d{2}",  # YYYY-MM-DD
-                    r"\d{2}/\d{2}/\d{4}",  # MM/DD/YYYY
-                    r"\d{4}年\d{1,2}月\d{1,2}日",  # YYYY年MM月DD日
-                ]
-                for pattern in date_patterns:
-                    date_match = re.search(pattern, response.text)
-                    if date_match:
-                        pub_date = date_match.group(0)
-                        break
-
-            # 提取摘要
-            abstract = ""
-
-            # 方法1: 使用meta描述 - 这里已经正确使用了字典
-            meta_desc = soup.find("meta", {"name": "description"}) or soup.find(
-                "meta", {"property": "og:description"}
-            )
-            if meta_desc and meta_desc.get("content"):
-                abstract = meta_desc.get("content")
-
-            # 方法2: 提取文章正文
-            if not abstract or len(abstract) < 100:
-                # 尝试找到文章主体
-                article = soup.find("article") or soup.find(
-                    class_=re.compile("article|content|post|entry")
-                )
-
-                if article:
-                    paragraphs = article.find_all("p")
-                else:
-                    paragraphs = soup.find_all("p")
-
-                content = []
-                for p in paragraphs:
-                    text = p.get_text().strip()
-                    if len(text) > 30:  # 忽略太短的段落
-                        content.append(text)
-
-                if content:
-                    abstract = " ".join(content[:3])[:500]  # 取前三段，最多500字
-
-            # 如果仍然没有摘要，使用页面标题
-            if not abstract:
-                title_tag = soup.find("title")
-                if title_tag:
-                    abstract = f"页面标题: {title_tag.get_text()}"
-
-            # 标准化日期格式
-            if pub_date:
-                try:
-                    # 尝试解析各种格式的日期
-                    if "T" in pub_date:
-                        pub_date = pub_date.split("T")[0]
-                    elif "/" in pub_date:
-                        date_parts = pub_date.split("/")
-                        if len(date_parts[2]) == 4:  # MM/DD/YYYY
-                            pub_date = f"{date_parts[2]}-{date_parts[0]}-{date_parts[1]}"
-                    elif "年" in pub_date:
-                        date_parts = re.findall(r"\d+", pub_date)
-                        if len(date_parts) >= 3:
-                            pub_date = (
-                                f"{date_parts[0]}-{date_parts[1].zfill(2)}-{date_parts[2].zfill(2)}"
-                            )
-                except Exception:
-                    # 如果日期解析失败，保留原始格式
-                    pass
-
             return abstract, pub_date
         except Exception as e:
             log.print_traceback("从URL提取内容摘要和发布日期", e)
             return "", None
 
+    def _get_cached_results(self, topic, cache_key, fingerprint, max_results, cache_duration):
+        """
+        查找可用的缓存结果：标准化后的话题相同，或 SimHash 相近且字符 2-gram Jaccard 相似度
+        不低于 similar_threshold；缓存的请求条数需不少于本次请求，多出的部分截掉
+        """
+        candidates = []
+        cached = self.cache.get(cache_key, max_age=cache_duration)
+        if cached is not None:
+            candidates.append((cache_key, cached))
+        candidates += [
+            (key, value)
+            for key, value, _ in self.cache.find_similar(fingerprint, max_age=cache_duration)
+            if key != cache_key and jaccard_similarity(key, cache_key) >= self.similar_threshold
+        ]
+
+        for key, value in candidates:
+            if value.get("max_results", 0) < max_results:
+                continue
+            self.cache.count("hits" if key == cache_key else "similar_hits")
+            if key == cache_key:
+                self.console.print(f"[blue]使用缓存结果: {topic}[/blue]")
+            else:
+                self.console.print(f"[blue]使用相似话题的缓存结果: {value.get('topic')}[/blue]")
+            return (value.get("results") or [])[:max_results]
+
+        self.cache.count("misses")
+        return None
+
     def search(
         self,
         topic,
@@ -737,107 +832,95 @@ class SearchService:
         cache_duration=3600,
         force_module=None,
         use_fix_results_parallel=True,
+        deadline=None,
     ):
-        """执行搜索，支持缓存和多种搜索方法"""
-        current_time = time.time()
-        cache_key = f"{topic}_{max_results}"
+        """
+        执行搜索，支持缓存和多种搜索方法
+        deadline 为本次搜索的总时间预算（秒），到期时返回已得到的部分结果
+        """
+        deadline_at = None if deadline is None else time.monotonic() + deadline
+        cache_key = normalize_topic(topic) or topic
+        fingerprint = simhash(cache_key)
 
         # 检查缓存
-        if use_cache and cache_key in self.cache:
-            cached_data = self.cache[cache_key]
-            timestamp = cached_data.get("timestamp", 0)
-
-            # 确保timestamp是浮点数
-            if isinstance(timestamp, str):
-                try:
-                    timestamp = float(timestamp)
-                except ValueError:
-                    timestamp = 0
-
-            if current_time - timestamp < cache_duration:
-                self.console.print(f"[blue]使用缓存结果: {topic}[/blue]")
-                return cached_data.get("results")
-
-        # 确保任务管理器已初始化
-        self._init_task_manager()
+        if use_cache:
+            cached_results = self._get_cached_results(
+                topic, cache_key, fingerprint, max_results, cache_duration
+            )
+            if cached_results is not None:
+                return cached_results
 
         # 选择搜索模块
-        module_id = force_module or self._get_best_module()
+        if force_module:
+            candidates = [force_module]
+        else:
+            candidates = self._rank_modules(len(self.modules_info["modules"]))
+            if not candidates:
+                # 首次使用：优先生成本次搜索需要的模块，其余在后台生成
+                try:
+                    module_id = self._generate_needed_module(deadline_at)
+                except TimeoutError as e:
+                    return f"未能找到关于'{topic}'的搜索结果: {e}"
+                candidates = [module_id] if module_id else []
 
-        if not module_id or module_id not in self.modules_info["modules"]:
+        if not candidates or candidates[0] not in self.modules_info["modules"]:
             self.console.print("[red]没有可用的搜索模块[/red]")
             return f"未能找到关于'{topic}'的搜索结果: 没有可用的搜索模块"
 
-        # 获取模块类型
-        module_type = self.modules_info["modules"][module_id]["type"]
-
-        # 检查是否需要重新生成模块
-        new_module_id = self._regenerate_module_if_needed(module_type)
+        # 检查首选模块是否需要重新生成
+        module_type = self.modules_info["modules"][candidates[0]]["type"]
+        try:
+            new_module_id = self._regenerate_module_if_needed(module_type, deadline_at)
+        except TimeoutError as e:
+            return f"未能找到关于'{topic}'的搜索结果: {e}"
         if new_module_id:
-            module_id = new_module_id
-
-        # 导入搜索模块
-        search_module = self._import_module(module_id)
-        if not search_module:
-            self.console.print(f"[red]无法导入搜索模块 {module_id}[/red]")
-            return f"未能找到关于'{topic}'的搜索结果: 无法导入搜索模块"
+            candidates[0] = new_module_id
 
         # 执行搜索
-        try:
-            result = search_module.search_web(topic, max_results)
-
-            # 检查搜索结果
-            if result.get("success", False):
-                # 验证并修复结果
-                results = result.get("results", [])
-                if results:
-                    if use_fix_results_parallel:
-                        fixed_results = self._validate_and_fix_results_parallel(results)
-                    else:
-                        fixed_results = self._validate_and_fix_results(results)
-
-                    result["results"] = fixed_results
-
-                # 更新模块成功率
-                if module_id in self.modules_info["success_rate"]:
-                    self.modules_info["success_rate"][module_id]["successes"] += 1
-                    self._save_modules_info()
-
-                # 更新缓存
-                if use_cache:
-                    self.cache[cache_key] = result
-                    self._save_cache()
-
-                return result.get("results")
+        min_results = max(1, min(self.min_results, max_results))
+        module_id, result, successes = self._race_modules(
+            candidates, topic, max_results, min_results, deadline_at
+        )
+        if not result.get("success", False):
+            self.console.print(f"[red]搜索执行错误: {result.get('error')}[/red]")
+            return f"未能找到关于'{topic}'的搜索结果: {result.get('error', '搜索失败')}"
+
+        # 合并已返回的各模块结果：URL 标准化、去重并按时效性和来源排序，
+        # 在补全之前进行，重复的网页只抓取一次
+        result["results"] = merge_results([r.get("results") for r in successes], max_results)
+
+        # 验证并修复结果
+        results = result["results"]
+        if results:
+            if use_fix_results_parallel:
+                fixed_results = self._validate_and_fix_results_parallel(results, deadline_at)
             else:
-                # 记录错误
-                self._log_error(module_id, "search_failed", result.get("error", "未知错误"), topic)
-
-                # 尝试使用备用模块
-                if not force_module:
-                    # 找到一个不同类型的模块
-                    for alt_id in self.modules_info["modules"]:
-                        if self.modules_info["modules"][alt_id]["type"] != module_type:
-                            self.console.print(f"[yellow]尝试使用备用搜索模块: {alt_id}[/yellow]")
-                            return self.search(
-                                topic, max_results, use_cache, cache_duration, alt_id
-                            )
-
-                return f"未能找到关于'{topic}'的搜索结果: {result.get('error', '搜索失败')}"
-
-        except Exception as e:
-            # 记录错误
-            self._log_error(module_id, "exception", str(e), topic)
-
-            # 如果是第一次尝试，尝试使用备用模块
-            if not force_module:
-                # 找到一个不同类型的模块
-                for alt_id in self.modules_info["modules"]:
-                    if self.modules_info["modules"][alt_id]["type"] != module_type:
-                        self.console.print(
-                            f"[yellow]搜索出错，尝试使用备用搜索模块: {alt_id}[/yellow]"
-                        )
-                        return self.search(topic, max_results, use_cache, cache_duration, alt_id)
-
-            self.console.print(f"[red]搜索执行错误: {str(e)}[/red]")
-            return f"未能找到关于'{topic}'的搜索结果: {str(e)}"
+                fixed_results = self._validate_and_fix_results(results, deadline_at)
+
+            result["results"] = fixed_results
+
+        # 更新缓存，记录可满足的请求条数，之后条数不超过它的相似搜索可直接使用；
+        # 到达截止时间时结果可能不完整（条数不足或未补全），只记录实际条数并短时间缓存
+        if use_cache:
+            partial = deadline_at is not None and time.monotonic() >= deadline_at
+            result["topic"] = topic
+            result["max_results"] = len(result["results"] or []) if partial else max_results
+            ttl = self.partial_cache_duration
+            if not partial:
+                ttl = max(cache_duration, self.default_cache_duration)
+            self.cache.put(cache_key, result, ttl=ttl, fingerprint=fingerprint)
+
+        return result.get("results")
+
+
+def get_search_service():
+    """
+    获取进程内共享的搜索服务，复用已加载的模块和缓存
+    aipy 配置重新加载（aipyapp.toml 被修改或保存配置）后，下次调用时重新创建
+    """
+    global _service
+    generation = Config.get_instance().get_aipy_generation()
+    with _service_lock:
+        if _service is None or _service.config_generation != generation:
+            _service = SearchService()
+        return _service
@@ -0,0 +1,241 @@
+import os
+import json
+import time
+import atexit
+import threading
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+
+from src.ai_auto_wxgzh.utils import log
+
+
+def _empty_info():
+    return {
+        "modules": {},
+        "default_module": None,
+        "success_rate": {},
+        "last_updated": {},
+        "warmup": {},  # 模块类型 -> 后台生成进度
+    }
+
+
+@contextmanager
+def file_lock(lock_file, timeout=10, stale=30):
+    """
+    跨平台的进程间文件锁（O_CREAT | O_EXCL 创建锁文件）
+    持有锁的进程异常退出时，超过 stale 秒的锁文件视为失效
+    """
+    deadline = time.time() + timeout
+    while True:
+        try:
+            fd = os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_file) > stale:
+                    os.remove(lock_file)
+                    continue
+            except OSError:
+                continue  # 锁刚好被释放
+            if time.time() > deadline:
+                raise TimeoutError(f"获取文件锁超时: {lock_file}")
+            time.sleep(0.05)
+    try:
+        os.close(fd)
+        yield
+    finally:
+        try:
+            os.remove(lock_file)
+        except OSError:
+            pass
+
+
+class ModuleStats:
+    """
+    搜索模块信息与成功/失败统计（modules_info.json）：
+    - 计数只在内存中累加，按时间（flush_interval 秒）或次数（flush_every 次）批量写入，退出时再写入
+    - 写入时先读取磁盘上的最新内容，把本进程的增量合并进去，多个进程同时更新不会互相覆盖
+    - 写入临时文件后原子替换，避免写到一半的文件被读取
+    - 最近的搜索耗时只保存在内存中，用于计算 p50 耗时
+    - 搜索收益（reward/trials）按 reward_half_life 指数衰减，越近的结果权重越大
+    """
+
+    LATENCY_SAMPLES = 50
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, info_file, flush_interval=5, flush_every=20, reward_half_life=3 * 24 * 3600):
+        self.info_file = Path(info_file)
+        self.reward_half_life = reward_half_life
+        self.lock_file = f"{self.info_file}.lock"
+        self.flush_interval = flush_interval
+        self.flush_every = flush_every
+
+        self._lock = threading.RLock()
+        self._deltas = {}  # module_id -> {"successes": n, "failures": n, "reward": r, "trials": n}
+        self._pending = 0
+        self._timer = None
+        self._latencies = {}  # module_id -> deque([秒])
+
+        self.data = _empty_info()
+        self._apply(self._read())
+        atexit.register(self.flush)
+
+    @classmethod
+    def get_instance(cls, info_file, **kwargs):
+        """获取指定文件的统计（进程内共享）"""
+        key = str(Path(info_file).resolve())
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(info_file, **kwargs)
+            return cls._instances[key]
+
+    def _read(self):
+        if self.info_file.exists():
+            try:
+                with open(self.info_file, "r", encoding="utf-8") as f:
+                    return {**_empty_info(), **json.load(f)}
+            except Exception:
+                pass
+        return _empty_info()
+
+    def _apply(self, info):
+        # 原地更新各部分，调用方持有的 data 引用保持有效
+        for section, value in info.items():
+            self.data[section] = value
+
+    def _merge(self, disk):
+        """以磁盘内容为基础，合并本进程的模块信息和计数增量"""
+        merged = {**disk}
+        merged["modules"] = {**disk["modules"], **self.data["modules"]}
+        merged["default_module"] = self.data["default_module"] or disk["default_module"]
+        merged["warmup"] = {**disk["warmup"]}
+        for module_type, progress in self.data["warmup"].items():
+            # 取更新时间较新的一方，避免本进程的旧进度覆盖其他进程的新进度
+            disk_progress = disk["warmup"].get(module_type, {})
+            if progress.get("updated_at", 0) >= disk_progress.get("updated_at", 0):
+                merged["warmup"][module_type] = progress
+        merged["last_updated"] = {**disk["last_updated"]}
+        for module_type, ts in self.data["last_updated"].items():
+            merged["last_updated"][module_type] = max(ts, disk["last_updated"].get(module_type, 0))
+
+        now = time.time()
+        success_rate = {k: dict(v) for k, v in disk["success_rate"].items()}
+        for module_id, stats in self.data["success_rate"].items():
+            if module_id not in success_rate:
+                success_rate[module_id] = dict(stats)  # 本进程新增的模块
+                continue
+            deltas = self._deltas.get(module_id, {})
+            if "trials" in deltas:
+                self._decay(success_rate[module_id], now)  # 收益增量未衰减，先把磁盘上的值衰减到现在
+            for field, delta in deltas.items():
+                success_rate[module_id][field] = success_rate[module_id].get(field, 0) + delta
+        merged["success_rate"] = success_rate
+        return merged
+
+    def _decay_factor(self, since, now):
+        return 0.5 ** (max(now - since, 0) / self.reward_half_life)
+
+    def _decay(self, stats, now):
+        factor = self._decay_factor(stats.get("updated_at", now), now)
+        stats["reward"] = stats.get("reward", 0) * factor
+        stats["trials"] = stats.get("trials", 0) * factor
+        stats["updated_at"] = now
+
+    def get_reward(self, module_id, now=None):
+        """返回衰减到当前时间的 (累计收益, 累计次数)"""
+        now = now or time.time()
+        with self._lock:
+            stats = self.data["success_rate"].get(module_id) or {}
+            factor = self._decay_factor(stats.get("updated_at", now), now)
+            return stats.get("reward", 0) * factor, stats.get("trials", 0) * factor
+
+    def record(self, module_id, success, reward=None):
+        """
+        记录一次搜索结果，reward 为本次搜索的收益（0~1），达到 flush_every 次立即写入，否则延迟写入
+        """
+        field = "successes" if success else "failures"
+        with self._lock:
+            stats = self.data["success_rate"].get(module_id)
+            if stats is None:
+                return
+            stats[field] = stats.get(field, 0) + 1
+            delta = self._deltas.setdefault(module_id, {})
+            delta[field] = delta.get(field, 0) + 1
+            if reward is not None:
+                self._decay(stats, time.time())
+                stats["reward"] += reward
+                stats["trials"] += 1
+                delta["reward"] = delta.get("reward", 0) + reward
+                delta["trials"] = delta.get("trials", 0) + 1
+            self._pending += 1
+
+            if self._pending >= self.flush_every:
+                self.flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def modules(self):
+        """返回模块信息的快照，遍历时不受其他线程登记新模块的影响"""
+        with self._lock:
+            return dict(self.data["modules"])
+
+    def add_module(self, module_id, info, make_default=False):
+        """登记新生成的模块并立即写入，还没有默认模块时设为默认"""
+        with self._lock:
+            self.data["modules"][module_id] = info
+            self.data["success_rate"][module_id] = {"successes": 0, "failures": 0}
+            self.data["last_updated"][info["type"]] = info["created_at"]
+            if make_default or not self.data["default_module"]:
+                self.data["default_module"] = module_id
+            return self.flush()
+
+    def update_warmup(self, module_type, **fields):
+        """更新并立即写入某类模块的后台生成进度"""
+        with self._lock:
+            progress = dict(self.data["warmup"].get(module_type, {}))
+            progress.update(fields, updated_at=time.time())
+            self.data["warmup"][module_type] = progress
+            return self.flush()
+
+    def record_latency(self, module_id, seconds):
+        with self._lock:
+            samples = self._latencies.setdefault(module_id, deque(maxlen=self.LATENCY_SAMPLES))
+            samples.append(seconds)
+
+    def latency_p50(self, module_id, default=None):
+        """最近搜索耗时的中位数，没有记录时返回 default"""
+        with self._lock:
+            samples = sorted(self._latencies.get(module_id, ()))
+        if not samples:
+            return default
+        return samples[len(samples) // 2]
+
+    def flush(self):
+        """合并并写入磁盘，失败时保留增量，下次写入时重试"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+            tmp_file = f"{self.info_file}.{os.getpid()}.tmp"
+            try:
+                with file_lock(self.lock_file):
+                    merged = self._merge(self._read())
+                    with open(tmp_file, "w", encoding="utf-8") as f:
+                        json.dump(merged, f, ensure_ascii=False, indent=2)
+                    os.replace(tmp_file, self.info_file)
+            except Exception as e:
+                log.print_log(f"保存模块信息失败: {str(e)}")
+                if os.path.exists(tmp_file):
+                    os.remove(tmp_file)
+                return False
+
+            self._apply(merged)
+            self._deltas = {}
+            self._pending = 0
+            return True
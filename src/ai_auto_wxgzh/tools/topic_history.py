@@ -0,0 +1,149 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+
+from src.ai_auto_wxgzh.utils import log
+from src.ai_auto_wxgzh.utils import utils
+
+
+SIMHASH_BITS = 64
+
+
+def simhash(text, ngram=2):
+    """计算文本的 64 位 SimHash（基于字符 n-gram，适合中文短标题）"""
+    if not text:
+        return 0
+    grams = [text[i : i + ngram] for i in range(max(len(text) - ngram + 1, 1))]
+    vector = [0] * SIMHASH_BITS
+    for gram in grams:
+        h = int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            vector[bit] += 1 if (h >> bit) & 1 else -1
+    return sum(1 << bit for bit in range(SIMHASH_BITS) if vector[bit] > 0)
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+class TopicHistory:
+    """
+    单个公众号已发布话题的历史记录，支持近似重复检测：
+    - 标准化标题完全一致，或 SimHash 汉明距离不超过 max_distance 视为重复
+    - SimHash 按 max_distance + 1 段分桶索引（鸽巢原理保证不漏检），查询只比较同桶记录
+    - 记录保存在本地 JSON 文件，超过 window_days 的记录自动清除
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, history_file, window_days=7, max_distance=6):
+        self.history_file = history_file
+        self.window = window_days * 24 * 3600
+        self.max_distance = max_distance
+        self._bands = max_distance + 1
+        self._band_bits = -(-SIMHASH_BITS // self._bands)  # 向上取整
+
+        self._lock = threading.Lock()
+        self._entries = []
+        self._keys = {}  # 标准化标题 -> 记录
+        self._buckets = {}  # (段序号, 段值) -> [记录]
+        self._load()
+
+    @classmethod
+    def get_instance(cls, appid, window_days=7, max_distance=6):
+        """获取指定公众号的历史记录（进程内共享）"""
+        with cls._instances_lock:
+            if appid not in cls._instances:
+                safe_name = re.sub(r"[^\w\-]", "_", appid) or "default"
+                history_dir = utils.get_current_dir("cache/topic_history")
+                cls._instances[appid] = cls(
+                    os.path.join(history_dir, f"{safe_name}.json"), window_days, max_distance
+                )
+            return cls._instances[appid]
+
+    def _band_values(self, value):
+        mask = (1 << self._band_bits) - 1
+        return [(i, (value >> (i * self._band_bits)) & mask) for i in range(self._bands)]
+
+    def _index(self, entry):
+        self._keys[entry["key"]] = entry
+        for band in self._band_values(entry["simhash"]):
+            self._buckets.setdefault(band, []).append(entry)
+
+    def _rebuild_index(self):
+        self._keys = {}
+        self._buckets = {}
+        for entry in self._entries:
+            self._index(entry)
+
+    def _load(self):
+        if not os.path.exists(self.history_file):
+            return
+        try:
+            with open(self.history_file, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except Exception as e:
+            log.print_log(f"加载话题历史失败: {str(e)}")
+            return
+
+        expire_before = time.time() - self.window
+        self._entries = [e for e in entries if e.get("timestamp", 0) >= expire_before]
+        self._rebuild_index()
+
+    def _save(self):
+        tmp_file = f"{self.history_file}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(tmp_file, self.history_file)
+        except Exception as e:
+            log.print_log(f"保存话题历史失败: {str(e)}")
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+
+    def find_similar(self, topic):
+        """返回窗口期内与 topic 近似重复的历史记录，没有则返回 None"""
+        key = utils.normalize_title(topic)
+        expire_before = time.time() - self.window
+        with self._lock:
+            entry = self._keys.get(key)
+            if entry and entry["timestamp"] >= expire_before:
+                return entry
+
+            value = simhash(key)
+            for band in self._band_values(value):
+                for entry in self._buckets.get(band, ()):
+                    if (
+                        entry["timestamp"] >= expire_before
+                        and hamming_distance(entry["simhash"], value) <= self.max_distance
+                    ):
+                        return entry
+        return None
+
+    def contains(self, topic):
+        return self.find_similar(topic) is not None
+
+    def add(self, topic, platform=None):
+        """记录已发布的话题，并清理过期记录"""
+        key = utils.normalize_title(topic)
+        entry = {
+            "topic": topic,
+            "platform": platform,
+            "key": key,
+            "simhash": simhash(key),
+            "timestamp": time.time(),
+        }
+        expire_before = entry["timestamp"] - self.window
+        with self._lock:
+            before = len(self._entries)
+            self._entries = [e for e in self._entries if e["timestamp"] >= expire_before]
+            self._entries.append(entry)
+            if len(self._entries) <= before:
+                self._rebuild_index()
+            else:
+                self._index(entry)
+            self._save()
@@ -0,0 +1,198 @@
+import time
+import functools
+import itertools
+from datetime import datetime
+
+import numpy as np
+
+from src.ai_auto_wxgzh.utils import utils
+
+
+_TIME_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y/%m/%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S")
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_time_string(value):
+    for fmt in _TIME_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).timestamp()
+        except ValueError:
+            continue
+    return None
+
+
+def _parse_update_time(value):
+    """解析平台热榜更新时间，支持时间戳（秒/毫秒）和常见日期字符串，失败返回 None"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return value / 1000 if value > 1e12 else float(value)
+    return _parse_time_string(str(value)[:19])
+
+
+class TopicScores:
+    """一次热榜快照的全部话题及其得分，可用于采样和调试"""
+
+    def __init__(self, titles, platforms, ranks, keys, components, scores):
+        self.titles = titles
+        self.platforms = platforms
+        self.ranks = ranks
+        self.keys = keys  # 标准化后的标题
+        self.components = components  # 各项得分，便于调试
+        self.scores = scores
+        total = scores.sum()
+        if total > 0:
+            self.probs = scores / total
+        else:
+            self.probs = np.full(len(scores), 1 / max(len(scores), 1))
+
+    def __len__(self):
+        return len(self.titles)
+
+    def sample(self, rng=None, exclude=None, platform_weights=None):
+        """
+        按综合得分采样一个话题，返回 (平台, 话题)
+        - exclude(话题) 返回 True 的话题会被跳过
+        - platform_weights 为 {平台: 权重} 时替换配置中的平台权重（如公众号的平台偏好）
+        """
+        if len(self) == 0:
+            return None
+        scores = self.scores
+        if platform_weights:
+            weight = self.components["weight"]
+            preferred = np.fromiter(
+                (platform_weights.get(p, 0.0) for p in self.platforms),
+                dtype=np.float64,
+                count=len(self),
+            )
+            scores = np.divide(
+                scores * preferred, weight, out=np.zeros(len(self)), where=weight > 0
+            )
+        mask = np.ones(len(self), dtype=bool)
+        if exclude:
+            mask = np.fromiter((not exclude(t) for t in self.titles), dtype=bool, count=len(self))
+            if not mask.any():
+                return None
+        probs = scores * mask
+        total = probs.sum()
+        if total <= 0:
+            if platform_weights:  # 偏好的平台没有可选话题
+                return None
+            probs, total = mask.astype(np.float64), mask.sum()
+        rng = rng or np.random.default_rng()
+        index = int(rng.choice(len(self), p=probs / total))
+        return self.platforms[index], self.titles[index]
+
+    def top(self, n=10):
+        """得分最高的 n 个话题及各项得分"""
+        order = np.argsort(-self.scores)[:n]
+        return [
+            {
+                "platform": self.platforms[i],
+                "title": self.titles[i],
+                "rank": int(self.ranks[i]),
+                "score": float(self.scores[i]),
+                "prob": float(self.probs[i]),
+                **{name: float(values[i]) for name, values in self.components.items()},
+            }
+            for i in order
+        ]
+
+
+class TopicScorer:
+    """
+    跨平台话题打分：一次性载入所有平台的热榜，综合以下因素计算得分
+    - 排名：1 / (rank + 1) ** rank_decay
+    - 平台权重：来自配置 platforms
+    - 跨平台共现：同一话题（标准化标题）出现在越多平台得分越高
+    - 时效：按平台热榜更新时间指数衰减
+    - 趋势：排名上升速度（名次/小时）越快得分越高，需要提供历史数据计算的 velocities
+    """
+
+    def __init__(
+        self,
+        platforms,
+        rank_decay=2.0,
+        cooccurrence_boost=0.5,
+        half_life=6 * 3600,
+        velocity_boost=0.5,
+        velocity_scale=5.0,
+    ):
+        self.platform_weights = {p["name"]: float(p["weight"]) for p in platforms}
+        self.rank_decay = rank_decay
+        self.cooccurrence_boost = cooccurrence_boost
+        self.half_life = half_life
+        self.velocity_boost = velocity_boost
+        self.velocity_scale = velocity_scale
+
+    def score(self, hotnews, cnt=5, now=None, velocities=None) -> TopicScores:
+        """velocities: {(平台, 标准化标题): 排名上升速度}，没有历史数据时为 None"""
+        now = now or time.time()
+        # 逐个平台收集标题，平台级的值（权重、时效）之后按话题数展开
+        titles, platforms, ranks = [], [], []
+        sizes, platform_weights, platform_ages, platform_ids = [], [], [], []
+        name_ids = {}
+        for platform in hotnews or []:
+            name = platform.get("name")
+            weight = self.platform_weights.get(name, 0)
+            if weight <= 0:
+                continue
+            platform_titles = [item.get("title") for item in (platform.get("data") or [])[:cnt]]
+            platform_ranks = np.arange(len(platform_titles), dtype=np.float64)
+            if not all(platform_titles):  # 跳过没有标题的条目，排名保持原位置
+                platform_ranks = platform_ranks[[bool(title) for title in platform_titles]]
+                platform_titles = [title for title in platform_titles if title]
+            if not platform_titles:
+                continue
+            updated_at = _parse_update_time(platform.get("update_time"))
+            titles.extend(platform_titles)
+            ranks.append(platform_ranks)
+            platforms.extend([name] * len(platform_titles))
+            sizes.append(len(platform_titles))
+            platform_weights.append(weight)
+            platform_ages.append(max(now - updated_at, 0) if updated_at else None)
+            platform_ids.append(name_ids.setdefault(name, len(name_ids)))
+
+        # 没有更新时间的平台不能算作刚更新，取有更新时间的平台的中位数
+        dated = [age for age in platform_ages if age is not None]
+        neutral_age = float(np.median(dated)) if dated else 0.0
+        platform_ages = [neutral_age if age is None else age for age in platform_ages]
+
+        count = len(titles)
+        keys = list(map(utils.normalize_title, titles))  # normalize_title 自带缓存
+        ranks = np.concatenate(ranks) if ranks else np.zeros(0)
+        weight = np.repeat(np.asarray(platform_weights, dtype=np.float64), sizes)
+        ages = np.repeat(np.asarray(platform_ages, dtype=np.float64), sizes)
+        rank_score = 1 / (ranks + 1) ** self.rank_decay
+
+        # 统计每个标准化标题出现在几个平台（同平台重复只算一次）：
+        # 标题编号 × 平台数 + 平台编号 得到 (标题, 平台) 编号，出现过的按标题求和
+        key_index = dict(zip(keys, range(count)))  # 同一标题取最后一次出现的位置作为编号
+        key_ids = np.fromiter(map(key_index.__getitem__, keys), dtype=np.intp, count=count)
+        name_count = max(len(name_ids), 1)
+        pairs = key_ids * name_count + np.repeat(np.asarray(platform_ids, dtype=np.intp), sizes)
+        present = np.bincount(pairs, minlength=count * name_count) > 0
+        occurrence = present.reshape(count, name_count).sum(axis=1)[key_ids]
+        cooccurrence = 1 + self.cooccurrence_boost * (occurrence - 1)
+
+        recency = 0.5 ** (ages / self.half_life)
+        if velocities:
+            velocity = np.fromiter(
+                map(velocities.get, zip(platforms, keys), itertools.repeat(0.0)),
+                dtype=np.float64,
+                count=count,
+            )
+        else:
+            velocity = np.zeros(count)
+        trend = 1 + self.velocity_boost * np.tanh(velocity / self.velocity_scale)
+
+        scores = rank_score * weight * cooccurrence * recency * trend
+        components = {
+            "rank_score": rank_score,
+            "weight": weight,
+            "cooccurrence": cooccurrence,
+            "recency": recency,
+            "velocity": velocity,
+            "trend": trend,
+        }
+        return TopicScores(titles, platforms, ranks, keys, components, scores)
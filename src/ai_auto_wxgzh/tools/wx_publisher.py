@@ -16,6 +16,7 @@ import time
 from src.ai_auto_wxgzh.utils import utils
 from src.ai_auto_wxgzh.config.config import Config
 from src.ai_auto_wxgzh.utils import log
+from src.ai_auto_wxgzh.utils import http_replay
 
 
 class PublishStatus(Enum):
@@ -63,7 +64,7 @@ class WeixinPublisher:
         url = f"{self.BASE_URL}/token?grant_type=client_credential&appid={self.app_id}&secret={self.app_secret}"  # noqa 501
 
         try:
-            response = requests.get(url)
+            response = http_replay.get(url)
             response.raise_for_status()
             data = response.json()
             access_token = data.get("access_token")
@@ -105,7 +106,7 @@ class WeixinPublisher:
 
             headers = {"Content-Type": "application/json"}
             json_data = json.dumps(data, ensure_ascii=False).encode("utf-8")
-            response = requests.post(url, data=json_data, headers=headers)
+            response = http_replay.post(url, data=json_data, headers=headers)
             response.raise_for_status()
             data = response.json()
 
@@ -139,7 +140,7 @@ class WeixinPublisher:
                     # 拼接绝对路径和文件名
                     file_path = os.path.join(image_dir, file_name)
                     with open(file_path, "wb+") as f:
-                        f.write(requests.get(result.url).content)
+                        f.write(http_replay.get(result.url).content)
                 img_url = rsp.output.results[0].url
             else:
                 log.print_log(
@@ -174,7 +175,7 @@ class WeixinPublisher:
         try:
             if image_url.startswith(("http://", "https://")):
                 # 处理网络图片
-                image_response = requests.get(image_url, stream=True)
+                image_response = http_replay.get(image_url, stream=True)
                 image_response.raise_for_status()
                 image_buffer = BytesIO(image_response.content)
 
@@ -202,7 +203,7 @@ class WeixinPublisher:
             url = f"{self.BASE_URL}/material/add_material?access_token={token}&type=image"
 
             files = {"media": (file_name, image_buffer, mime_type)}
-            response = requests.post(url, files=files)
+            response = http_replay.post(url, files=files)
             response.raise_for_status()
             data = response.json()
 
@@ -254,7 +255,7 @@ class WeixinPublisher:
         data = {"media_id": media_id}
 
         try:
-            response = requests.post(url, params=params, json=data)
+            response = http_replay.post(url, params=params, json=data)
             response.raise_for_status()
             result = response.json()
 
@@ -284,7 +285,7 @@ class WeixinPublisher:
         params = {"publish_id": publish_id}
 
         for _ in range(max_retries):
-            response = requests.post(url, json=params).json()
+            response = http_replay.post(url, json=params).json()
             if response.get("article_id"):
                 return response.get("article_detail")["item"][0]["article_url"]
 
@@ -307,7 +308,7 @@ class WeixinPublisher:
         }
         menu_url = f"{self.BASE_URL}/menu/create?access_token={self._ensure_access_token()}"
         try:
-            result = requests.post(menu_url, json=menu_data).json()
+            result = http_replay.post(menu_url, json=menu_data).json()
             if "errcode" in result and result.get("errcode") != 0:
                 ret = f"创建菜单失败: {result.get('errmsg')}"
         except Exception as e:
@@ -335,7 +336,7 @@ class WeixinPublisher:
         url = f"{self.BASE_URL}/media/uploadnews?access_token={self._ensure_access_token()}"
 
         try:
-            result = requests.post(url, json=data).json()
+            result = http_replay.post(url, json=data).json()
             if "errcode" in result and result.get("errcode") != 0:
                 ret = f"上传图文消息素材失败: {result.get('errmsg')}", None
             elif "media_id" not in result:
@@ -361,7 +362,7 @@ class WeixinPublisher:
         url = f"{self.BASE_URL}/message/mass/sendall?access_token={self._ensure_access_token()}"
 
         try:
-            result = requests.post(url, json=data).json()
+            result = http_replay.post(url, json=data).json()
             if "errcode" in result and result.get("errcode") != 0:
                 ret = f"根据标签进行群发失败: {result.get('errmsg')}"
         except Exception as e:
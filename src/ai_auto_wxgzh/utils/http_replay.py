@@ -0,0 +1,226 @@
+"""
+HTTP 录制/回放层，用于离线、可重复地测试和评估整个流程的吞吐
+
+通过环境变量控制：
+- AIWX_HTTP_MODE：live（默认，直接请求）、record（请求并录制）、replay（只从录制文件回放）
+- AIWX_HTTP_CASSETTE：录制文件路径，默认 cache/http_cassette.jsonl（每行一条响应，录制时追加）
+- AIWX_HTTP_LATENCY：回放时模拟的延迟，秒数或 recorded（使用录制时的实际耗时），默认不延迟
+
+相同请求（方法 + URL + 请求体）多次出现时按顺序回放，超出后重复最后一次的响应。
+URL 参数和 JSON 响应体中的 access_token、secret 等敏感字段会替换为 ***，
+Set-Cookie、Authorization 等响应头不写入录制文件（请求头本身不录制）。
+"""
+
+import os
+import json
+import time
+import base64
+import hashlib
+import threading
+from datetime import timedelta
+from urllib.parse import urlencode, urlsplit, urlunsplit, parse_qsl
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+
+MODE_LIVE = "live"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+
+_SENSITIVE_PARAMS = {"access_token", "refresh_token", "secret", "appsecret", "key", "api_key"}
+_SENSITIVE_HEADERS = {"set-cookie", "cookie", "authorization", "proxy-authorization"}
+
+
+def _normalize_url(url, params=None):
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        query += list(params.items()) if isinstance(params, dict) else list(params)
+    query = [(k, "***" if k.lower() in _SENSITIVE_PARAMS else v) for k, v in query]
+    return urlunsplit(parts._replace(query=urlencode(sorted(query))))
+
+
+def _redact_json(value):
+    """把 JSON 数据中敏感字段的值替换为 ***"""
+    if isinstance(value, dict):
+        return {
+            k: "***" if str(k).lower() in _SENSITIVE_PARAMS else _redact_json(v)
+            for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [_redact_json(v) for v in value]
+    return value
+
+
+def _redact_content(content):
+    """JSON 响应体去掉敏感字段后重新编码，其他内容原样返回"""
+    if content.lstrip()[:1] not in (b"{", b"["):
+        return content
+    try:
+        data = json.loads(content)
+    except ValueError:
+        return content
+    redacted = _redact_json(data)
+    if redacted == data:
+        return content
+    return json.dumps(redacted, ensure_ascii=False).encode("utf-8")
+
+
+def _body_digest(kwargs):
+    if kwargs.get("json") is not None:
+        body = json.dumps(kwargs["json"], ensure_ascii=False, sort_keys=True).encode("utf-8")
+    elif kwargs.get("data") is not None:
+        body = kwargs["data"]
+        if isinstance(body, dict):
+            body = urlencode(sorted(body.items()))
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+    else:
+        return ""  # 上传文件（files）等不参与匹配，按顺序回放
+    return hashlib.sha1(body).hexdigest()
+
+
+class Cassette:
+    """录制文件（JSON Lines，每行一条带请求键的响应）：请求键 -> 按顺序记录的响应列表"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._cursors = {}
+        if os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:  # 录制中断时最后一行可能不完整
+                    continue
+                if "key" in entry:
+                    key = entry.pop("key")
+                    self._entries.setdefault(key, []).append(entry)
+                else:  # 旧版录制文件：整个文件为 请求键 -> 响应列表
+                    for key, entries in entry.items():
+                        self._entries.setdefault(key, []).extend(entries)
+
+    @staticmethod
+    def make_key(method, url, params=None, **kwargs):
+        return f"{method.upper()} {_normalize_url(url, params)} {_body_digest(kwargs)}".rstrip()
+
+    def record(self, key, response, elapsed):
+        content = _redact_content(response.content)
+        headers = {
+            k: v for k, v in response.headers.items() if k.lower() not in _SENSITIVE_HEADERS
+        }
+        if content is not response.content:
+            headers.pop("Content-Length", None)  # 响应体已改写
+        entry = {
+            "status_code": response.status_code,
+            "reason": response.reason,
+            "url": _normalize_url(response.url),
+            "headers": headers,
+            "content": base64.b64encode(content).decode("ascii"),
+            "elapsed": elapsed,
+        }
+        line = json.dumps({"key": key, **entry}, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._entries.setdefault(key, []).append(entry)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def play(self, key):
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                return None
+            cursor = self._cursors.get(key, 0)
+            self._cursors[key] = cursor + 1
+            return entries[min(cursor, len(entries) - 1)]
+
+
+_cassette = None
+_cassette_lock = threading.Lock()
+
+
+def get_mode():
+    return os.environ.get("AIWX_HTTP_MODE", MODE_LIVE).lower()
+
+
+def get_cassette():
+    global _cassette
+    with _cassette_lock:
+        if _cassette is None:
+            path = os.environ.get("AIWX_HTTP_CASSETTE")
+            if not path:
+                from src.ai_auto_wxgzh.utils import utils
+
+                path = os.path.join(utils.get_current_dir("cache"), "http_cassette.jsonl")
+            _cassette = Cassette(path)
+        return _cassette
+
+
+def _build_response(entry, method, url):
+    response = requests.Response()
+    response.status_code = entry["status_code"]
+    response.reason = entry.get("reason")
+    response.headers = CaseInsensitiveDict(entry["headers"])
+    # 已解码内容不能再按 gzip 等解码
+    response.headers.pop("Content-Encoding", None)
+    response._content = base64.b64decode(entry["content"])
+    response._content_consumed = True  # iter_content 直接从 _content 读取
+    response.elapsed = timedelta(seconds=entry.get("elapsed", 0))
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.url = url
+    response.request = requests.Request(method.upper(), url).prepare()
+    return response
+
+
+def _simulate_latency(entry):
+    latency = os.environ.get("AIWX_HTTP_LATENCY")
+    if not latency:
+        return
+    if latency == "recorded":
+        time.sleep(entry.get("elapsed", 0))
+    else:
+        time.sleep(float(latency))
+
+
+def request(method, url, session=None, **kwargs) -> requests.Response:
+    """
+    与 requests.request 用法一致，根据 AIWX_HTTP_MODE 直接请求、录制或回放
+    传入 session（requests.Session）时复用其连接池
+    """
+    sender = session or requests
+    mode = get_mode()
+    if mode == MODE_LIVE:
+        return sender.request(method, url, **kwargs)
+
+    cassette = get_cassette()
+    key = Cassette.make_key(method, url, **kwargs)
+
+    if mode == MODE_REPLAY:
+        entry = cassette.play(key)
+        if entry is None:
+            raise requests.exceptions.ConnectionError(f"回放文件中没有该请求的记录: {key}")
+        _simulate_latency(entry)
+        return _build_response(entry, method, url)
+
+    start = time.time()
+    response = sender.request(method, url, **kwargs)
+    cassette.record(key, response, time.time() - start)  # 读取 content 后仍可 iter_content
+    return response
+
+
+def get(url, params=None, **kwargs) -> requests.Response:
+    return request("get", url, params=params, **kwargs)
+
+
+def post(url, data=None, json=None, **kwargs) -> requests.Response:
+    return request("post", url, data=data, json=json, **kwargs)
@@ -8,7 +8,10 @@ import time
 import sys
 import shutil
 import webbrowser
+import unicodedata
+from functools import lru_cache
 from src.ai_auto_wxgzh.utils import log
+from src.ai_auto_wxgzh.utils import http_replay
 
 
 def copy_file(src_file, dest_file):
@@ -82,6 +85,16 @@ def get_random_platform(platforms):
             return platform["name"]
 
 
+@lru_cache(maxsize=4096)
+def normalize_title(title):
+    """
+    标准化话题标题，用于跨平台比较同一话题：
+    全半角统一、转小写、去掉标点/空白/表情等非文字字符
+    """
+    text = unicodedata.normalize("NFKC", title or "").lower()
+    return "".join(ch for ch in text if ch.isalnum())
+
+
 def extract_modified_article(content):
     match = re.search(r"```(?:html)?\s*([\s\S]*?)```", content, re.DOTALL)
 
@@ -416,7 +429,7 @@ def download_and_save_image(image_url, local_image_folder):
             os.makedirs(local_image_folder)
 
         # 下载图片，允许重定向
-        response = requests.get(image_url, stream=True, allow_redirects=True)
+        response = http_replay.get(image_url, stream=True, allow_redirects=True)
         response.raise_for_status()
 
         # 生成本地文件名
@@ -0,0 +1,58 @@
+# bench_page_extractor.py
+# 网页摘要/日期提取的准确率和耗时测试，样本位于 tests/page_corpus（expected.json 为期望结果）
+# real_*.html 是真实新闻网页删减后的样本（来源见文件开头的注释），期望结果附带摘要开头；
+# 其余为覆盖各种日期格式的构造样本
+# 用法：python tests/bench_page_extractor.py [重复次数]
+
+import sys
+import os
+import json
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from src.ai_auto_wxgzh.tools import page_extractor  # noqa 402
+
+CORPUS_DIR = os.path.join(current_dir, "page_corpus")
+
+
+def load_corpus():
+    with open(os.path.join(CORPUS_DIR, "expected.json"), "r", encoding="utf-8") as f:
+        expected = json.load(f)
+    pages = []
+    for name, info in expected.items():
+        with open(os.path.join(CORPUS_DIR, name), "r", encoding="utf-8") as f:
+            pages.append((name, info["url"], f.read(), info.get("pub_time"), info.get("abstract")))
+    return pages
+
+
+def main(repeat=200):
+    pages = load_corpus()
+    print(f"解析器: {page_extractor.HTML_PARSER}，样本数: {len(pages)}")
+
+    correct = abstract_correct = abstract_total = 0
+    for name, url, html, expected_date, expected_abstract in pages:
+        abstract, pub_date = page_extractor.extract(html, url)
+        ok = pub_date == expected_date
+        correct += ok
+        if expected_abstract is not None:  # 摘要只需以期望的开头开始
+            abstract_ok = abstract.startswith(expected_abstract)
+            abstract_correct += abstract_ok
+            abstract_total += 1
+            ok &= abstract_ok
+        mark = "OK  " if ok else "FAIL"
+        print(f"{mark} {name}: 日期={pub_date}（期望 {expected_date}），摘要={abstract[:20]!r}")
+    print(f"日期准确率: {correct}/{len(pages)}，摘要准确率: {abstract_correct}/{abstract_total}")
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for _, url, html, _, _ in pages:
+            page_extractor.extract(html, url)
+    elapsed = time.perf_counter() - start
+    print(f"平均耗时: {elapsed / (repeat * len(pages)) * 1000:.3f} ms/页")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
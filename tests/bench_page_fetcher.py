@@ -0,0 +1,108 @@
+# bench_page_fetcher.py
+# 网页抓取器的站点并发限制测试：启动本地 HTTP 服务，同一站点的请求超过 per_host 时应等待名额而不是失败，
+# 按站点排队提交时，排在后面的其他站点的网页不会被同一站点的网页占满线程而延后
+# 用法：python tests/bench_page_fetcher.py
+
+import sys
+import os
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from src.ai_auto_wxgzh.tools.page_fetcher import PageFetcher  # noqa 402
+
+DELAY = 0.3
+_active = 0
+_max_active = 0
+_lock = threading.Lock()
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        global _active, _max_active
+        with _lock:
+            _active += 1
+            _max_active = max(_max_active, _active)
+        time.sleep(DELAY)
+        body = f"<html><head><title>{self.path}</title></head><body></body></html>".encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        with _lock:
+            _active -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+def fetch_title(fetcher, url, deadline_at=None):
+    _, html = fetcher.get_html_head(url, deadline_at)
+    return html
+
+
+def check(fetcher, urls, deadline_at=None, label=""):
+    start = time.perf_counter()
+    results = fetcher.map(lambda url: fetch_title(fetcher, url, deadline_at), urls, deadline_at)
+    elapsed = time.perf_counter() - start
+    fetched = sum(1 for url, html in zip(urls, results) if html != url)
+    ok = fetched == len(urls) and _max_active <= fetcher.per_host
+    print(
+        f"{'OK  ' if ok else 'FAIL'} {label}: 成功 {fetched}/{len(urls)}，"
+        f"同站点最大并发 {_max_active}（上限 {fetcher.per_host}），耗时 {elapsed:.2f}s"
+    )
+    return ok
+
+
+def check_mixed_hosts(fetcher, slow_urls, fast_urls, url=None, label=""):
+    """同一站点的网页排在前面，其他站点的网页不应等前面的网页完成"""
+    start = time.perf_counter()
+    finished = {}
+
+    def fetch(target):
+        html = fetch_title(fetcher, target)
+        finished[target] = time.perf_counter() - start
+        return html
+
+    fetcher.map(fetch, slow_urls + fast_urls, url=url)
+    fast_elapsed = max(finished.get(target, float("inf")) for target in fast_urls)
+    ok = fast_elapsed < DELAY * (len(fast_urls) / fetcher.per_host + 0.5)
+    print(
+        f"{'OK  ' if ok else 'INFO'} {label}: 排在后面的其他站点网页 {fast_elapsed:.2f}s 完成，"
+        f"全部 {max(finished.values()):.2f}s"
+    )
+    return ok
+
+
+def main():
+    global _max_active
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    fetcher = PageFetcher(max_workers=4, per_host=1)
+    urls = [f"{base}/a", f"{base}/b"]
+    ok = check(fetcher, urls, label="同站点两个网页，无截止时间")
+    _max_active = 0
+    ok &= check(fetcher, urls, time.monotonic() + 5, label="同站点两个网页，有截止时间")
+
+    # 127.0.0.1 和 localhost 视为两个站点
+    fetcher = PageFetcher(max_workers=4, per_host=1)
+    slow_urls = [f"{base}/slow{i}" for i in range(6)]
+    fast_urls = [f"http://localhost:{server.server_port}/fast{i}" for i in range(2)]
+    check_mixed_hosts(fetcher, slow_urls, fast_urls, label="不按站点排队（对照）")
+    ok &= check_mixed_hosts(
+        fetcher, slow_urls, fast_urls, url=lambda target: target, label="按站点排队"
+    )
+
+    server.shutdown()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# bench_topic_scorer.py
+# 热榜话题打分的耗时测试：随机生成 15 个平台 × 30 条热榜（约 450 个话题），可选排名上升速度
+# 用法：python tests/bench_topic_scorer.py [重复次数]
+
+import sys
+import os
+import time
+import random
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from src.ai_auto_wxgzh.utils import utils  # noqa 402
+from src.ai_auto_wxgzh.tools.topic_scorer import TopicScorer  # noqa 402
+
+PLATFORMS = 15
+TOPICS = 30
+WORDS = ["科技", "经济", "体育", "娱乐", "国际", "社会", "教育", "健康", "汽车", "房产"]
+
+
+def make_hotnews(rng):
+    return [
+        {
+            "name": f"平台{i}",
+            "update_time": "2026-10-17 10:00:00",
+            "data": [
+                {"title": f"{rng.choice(WORDS)}新闻{rng.randint(0, 60)}号"} for _ in range(TOPICS)
+            ],
+        }
+        for i in range(PLATFORMS)
+    ]
+
+
+def bench(scorer, hotnews, repeat, velocities=None):
+    scorer.score(hotnews, cnt=TOPICS, velocities=velocities)  # 预热标题标准化缓存
+    start = time.perf_counter()
+    for _ in range(repeat):
+        scores = scorer.score(hotnews, cnt=TOPICS, velocities=velocities)
+    elapsed = time.perf_counter() - start
+    return len(scores), elapsed / repeat * 1e6
+
+
+def main(repeat=1000):
+    rng = random.Random(1)
+    hotnews = make_hotnews(rng)
+    scorer = TopicScorer([{"name": p["name"], "weight": 1} for p in hotnews])
+    velocities = {
+        (p["name"], utils.normalize_title(item["title"])): rng.uniform(-10, 10)
+        for p in hotnews
+        for item in p["data"]
+    }
+
+    count, cost = bench(scorer, hotnews, repeat)
+    print(f"话题数: {count}，无历史数据: {cost:.0f} us/次")
+    count, cost = bench(scorer, hotnews, repeat, velocities)
+    print(f"话题数: {count}，含排名上升速度: {cost:.0f} us/次")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,187 @@
+# check_hotnews_aggregator.py
+# 热榜数据源聚合器测试：启动本地 HTTP 服务返回预置的热榜数据，检查 quorum、数据源失败时使用其他数据源、
+# 超时返回部分结果，以及上次请求未结束的数据源不重复请求
+# 用法：python tests/check_hotnews_aggregator.py
+
+import sys
+import os
+import json
+import time
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from src.ai_auto_wxgzh.utils import log  # noqa 402
+from src.ai_auto_wxgzh.tools.hotnews_sources import HotnewsAggregator, HotnewsProvider  # noqa 402
+
+SLOW = 1.0
+
+VVHAN = {
+    "success": True,
+    "data": [
+        {"name": "微博", "update_time": "2025-06-01 12:00:00", "data": [{"title": "话题甲"}]},
+        {"name": "知乎", "data": [{"title": "话题乙"}]},
+    ],
+}
+PLATFORM_DICT = {"data": {"微博": [{"title": "话题甲"}, {"title": "话题丙"}], "抖音": [{"title": "话题丁"}]}}
+
+# 路径 -> (延迟秒数, 状态码, 响应体)
+ROUTES = {
+    "/vvhan": (0, 200, json.dumps(VVHAN, ensure_ascii=False)),
+    "/dict": (0, 200, json.dumps(PLATFORM_DICT, ensure_ascii=False)),
+    "/slow": (SLOW, 200, json.dumps(VVHAN, ensure_ascii=False)),
+    "/error": (0, 500, "{}"),
+    "/bad-json": (0, 200, "<html>维护中</html>"),
+    "/bad-format": (0, 200, json.dumps({"success": False})),
+}
+
+_hits = Counter()
+_lock = threading.Lock()
+
+
+class CannedHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        with _lock:
+            _hits[self.path] += 1
+        delay, status, body = ROUTES[self.path]
+        time.sleep(delay)
+        body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):  # 客户端已超时断开
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+def make_aggregator(base, routes, quorum=1, timeout=5, parsers=None):
+    """数据源的请求超时固定为 5 秒，聚合器超时返回后请求在后台继续"""
+    parsers = parsers or {}
+    providers = [
+        HotnewsProvider(route, f"{base}{route}", parser=parsers.get(route, "vvhan"), timeout=5)
+        for route in routes
+    ]
+    return HotnewsAggregator(providers, quorum=quorum, timeout=timeout)
+
+
+def report(ok, label, detail):
+    print(f"{'OK  ' if ok else 'FAIL'} {label}: {detail}")
+    return ok
+
+
+def platforms_of(result):
+    return {p["name"]: [item["title"] for item in p["data"]] for p in result or []}
+
+
+def check_quorum(base):
+    ok = True
+    parsers = {"/dict": "platform_dict"}
+
+    aggregator = make_aggregator(base, ["/vvhan", "/slow"], quorum=1, parsers=parsers)
+    start = time.perf_counter()
+    result = aggregator.fetch()
+    elapsed = time.perf_counter() - start
+    ok &= report(
+        result is not None and elapsed < SLOW / 2,
+        "quorum=1",
+        f"不等待慢数据源，{elapsed:.2f}s 返回 {sorted(platforms_of(result))}",
+    )
+
+    aggregator = make_aggregator(base, ["/vvhan", "/dict", "/slow"], quorum=2, parsers=parsers)
+    start = time.perf_counter()
+    result = platforms_of(aggregator.fetch())
+    elapsed = time.perf_counter() - start
+    ok &= report(
+        elapsed < SLOW / 2
+        and set(result) == {"微博", "知乎", "抖音"}
+        and result["微博"] == ["话题甲", "话题丙"],
+        "quorum=2",
+        f"合并两个数据源（同名平台去重），{elapsed:.2f}s 返回 {result}",
+    )
+    return ok
+
+
+def check_failover(base):
+    routes = ["/error", "/bad-json", "/bad-format", "/vvhan"]
+    aggregator = make_aggregator(base, routes, quorum=1)
+    result = platforms_of(aggregator.fetch())
+    stats = aggregator.get_stats()
+    failed = [route for route in routes[:-1] if stats[route]["failures"] == 1]
+    return report(
+        set(result) == {"微博", "知乎"} and failed == routes[:-1],
+        "数据源失败",
+        f"HTTP 500、非 JSON、格式错误的数据源记录失败 {failed}，使用 /vvhan 的结果 {sorted(result)}",
+    )
+
+
+def check_timeout(base):
+    ok = True
+    aggregator = make_aggregator(base, ["/slow"], timeout=0.3)
+    start = time.perf_counter()
+    result = aggregator.fetch()
+    elapsed = time.perf_counter() - start
+    ok &= report(
+        result is None and elapsed < SLOW / 2, "超时", f"{elapsed:.2f}s 返回 {result}"
+    )
+
+    aggregator = make_aggregator(base, ["/vvhan", "/slow"], quorum=2, timeout=0.3)
+    start = time.perf_counter()
+    result = aggregator.fetch()
+    elapsed = time.perf_counter() - start
+    ok &= report(
+        set(platforms_of(result)) == {"微博", "知乎"} and elapsed < SLOW / 2,
+        "超时返回部分结果",
+        f"quorum=2 只收到一个结果，{elapsed:.2f}s 返回 {sorted(platforms_of(result))}",
+    )
+    return ok
+
+
+def check_in_flight(base):
+    ok = True
+    aggregator = make_aggregator(base, ["/slow"], timeout=0.2)
+    with _lock:
+        _hits["/slow"] = 0
+    aggregator.fetch()  # 超时返回，请求仍在进行
+    aggregator.fetch()
+    with _lock:
+        hits = _hits["/slow"]
+    ok &= report(hits == 1, "请求未结束时不重复请求", f"两次 fetch，数据源收到 {hits} 次请求")
+
+    time.sleep(SLOW)  # 等上次请求结束
+    aggregator.timeout = SLOW * 2
+    result = aggregator.fetch()
+    with _lock:
+        hits = _hits["/slow"]
+    ok &= report(
+        hits == 2 and result is not None,
+        "请求结束后重新请求",
+        f"数据源共收到 {hits} 次请求，返回 {sorted(platforms_of(result))}",
+    )
+    return ok
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CannedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    ok = check_quorum(base)
+    ok &= check_failover(base)
+    ok &= check_timeout(base)
+    ok &= check_in_flight(base)
+
+    server.shutdown()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
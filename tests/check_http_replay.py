@@ -0,0 +1,81 @@
+# check_http_replay.py
+# HTTP 录制脱敏测试：启动本地 HTTP 服务模拟微信 /cgi-bin/token 接口，录制后检查录制文件中没有 token 和 Cookie，
+# 再回放确认脱敏后的响应仍可使用
+# 用法：python tests/check_http_replay.py
+
+import sys
+import os
+import json
+import base64
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from src.ai_auto_wxgzh.utils import http_replay  # noqa 402
+
+TOKEN = "86_SECRET_ACCESS_TOKEN_abcdef"
+REFRESH = "REFRESH_TOKEN_123456"
+COOKIE = "session=COOKIE_VALUE_987"
+
+
+class TokenHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = json.dumps(
+            {"access_token": TOKEN, "refresh_token": REFRESH, "expires_in": 7200}
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; encoding=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Set-Cookie", COOKIE)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def check(label, ok):
+    print(f"{'OK  ' if ok else 'FAIL'} {label}")
+    return ok
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), TokenHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = (
+        f"http://127.0.0.1:{server.server_port}/cgi-bin/token"
+        "?grant_type=client_credential&appid=wx123&secret=APP_SECRET_XYZ"
+    )
+    cassette_file = os.path.join(tempfile.mkdtemp(), "cassette.jsonl")
+    os.environ["AIWX_HTTP_CASSETTE"] = cassette_file
+
+    os.environ["AIWX_HTTP_MODE"] = http_replay.MODE_RECORD
+    response = http_replay.get(url, headers={"Authorization": "Bearer AUTH_HEADER_555"})
+    ok = check("录制时调用方拿到原始响应", response.json()["access_token"] == TOKEN)
+    server.shutdown()
+
+    with open(cassette_file, "r", encoding="utf-8") as f:
+        recorded = f.read()
+    decoded = "".join(
+        base64.b64decode(json.loads(line)["content"]).decode("utf-8")
+        for line in recorded.splitlines()
+    )
+    for secret in (TOKEN, REFRESH, COOKIE, "APP_SECRET_XYZ", "AUTH_HEADER_555"):
+        ok &= check(f"录制文件中没有 {secret}", secret not in recorded and secret not in decoded)
+
+    os.environ["AIWX_HTTP_MODE"] = http_replay.MODE_REPLAY
+    http_replay._cassette = None  # 重新读取录制文件
+    replayed = http_replay.get(url).json()
+    ok &= check(
+        "回放的响应可解析，token 已替换",
+        replayed["access_token"] == "***" and replayed["expires_in"] == 7200,
+    )
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
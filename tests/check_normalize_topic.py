@@ -0,0 +1,46 @@
+# check_normalize_topic.py
+# 搜索话题标准化测试：繁体/简体、全半角、大小写、标点不同的话题应得到相同的缓存键
+# 未安装 opencc 时检查内置的繁简对照表
+# 用法：python tests/check_normalize_topic.py
+
+import sys
+import os
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from src.ai_auto_wxgzh.utils import log  # noqa 402
+from src.ai_auto_wxgzh.tools import search_cache  # noqa 402
+
+# (话题, 等价的话题)
+CASES = [
+    ("蘋果發佈新款手機", "苹果发布新款手机"),
+    ("颱風「海葵」登陸臺灣", "台风海葵登陆台湾"),
+    ("國務院常務會議部署經濟工作", "国务院常务会议部署经济工作"),
+    ("後續報導：醫療體制改革進展", "后续报导医疗体制改革进展"),
+    ("週末氣溫驟降 專家提醒注意保暖", "周末气温骤降专家提醒注意保暖"),
+    ("電動車銷量創歷史新高", "电动车销量创历史新高"),
+    ("ＡＩ大模型　開源", "ai大模型开源"),
+    ("網紅餐廳排隊兩小時，值不值？", "网红餐厅排队两小时值不值"),
+    ("股市震盪 資金流向觀察", "股市震荡资金流向观察"),
+    ("麵包價格上漲 鬆餅店歇業", "面包价格上涨松饼店歇业"),
+]
+
+
+def main():
+    print(f"opencc: {'已安装' if search_cache._t2s_converter is not None else '未安装，使用内置对照表'}")
+    failed = 0
+    for topic, expected in CASES:
+        key = search_cache.normalize_topic(topic)
+        # 内置对照表单独检查，已安装 opencc 时也要保证其可用
+        fallback = search_cache.utils.normalize_title(topic).translate(search_cache._t2s_table())
+        ok = key == expected and fallback == expected
+        failed += not ok
+        print(f"{'OK  ' if ok else 'FAIL'} {topic} -> {key}（内置对照表: {fallback}，期望 {expected}）")
+    print(f"通过: {len(CASES) - failed}/{len(CASES)}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()